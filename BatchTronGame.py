@@ -0,0 +1,164 @@
+"""Lockstep batch of Tron games.
+   Holds N games as numpy arrays so every ongoing game advances one tick per update,
+   finished games stay in the arrays and are masked out of further updates
+"""
+import numpy as np
+from TronCore import TronCore, GameOutcome
+from ai_inputs import RayIndex, dist_totals_batch, fill_batch, BASIC
+from board import DEFAULT_BOARD, walls
+from compiled_net import CompiledNetworks
+
+
+class BatchTronGame:
+
+    GameState = TronCore.GameState
+
+    # movement in cells for each AI output index: up, down, left, right
+    DIRECTIONS = np.array(TronCore.DIRECTIONS)
+
+    # game states stored as their enum values
+    ONGOING = GameState.ongoing.value
+    RED_WON = GameState.red_won.value
+    BLUE_WON = GameState.blue_won.value
+    TIE = GameState.tie.value
+
+
+    # game i is played by red_nets[i] against blue_nets[i]
+    # compile_nets evaluates all the neat networks of a tick in one CompiledNetworks call instead of one activate() each
+    # every game is played on board, which has to be dense since all of them are stacked into arrays
+    # only the basic percept set is batched, percept_set is there so asking for another one fails
+    def __init__(self, red_nets, blue_nets, compile_nets=False, board=None, percept_set=BASIC):
+        self._board = board if board is not None else DEFAULT_BOARD
+        if self._board.sparse:
+            raise ValueError("Batched games are stacked into dense arrays, they cannot be played on a sparse board")
+        if percept_set != BASIC:
+            raise ValueError("Batched games only have the {0} percepts, got {1}".format(BASIC, percept_set))
+        if len(red_nets) != len(blue_nets):
+            raise ValueError("Expected the same number of red and blue nets, got {0} and {1}"
+                             .format(len(red_nets), len(blue_nets)))
+
+        self._ai_red = list(red_nets)
+        self._ai_blue = list(blue_nets)
+        n = len(self._ai_red)
+
+        # every distinct network is compiled once, games refer to it by index
+        self._compiled = None
+        if compile_nets and n > 0:
+            unique = dict((id(net), net) for net in self._ai_red + self._ai_blue)
+            net_index = dict((key, i) for i, key in enumerate(unique))
+            self._compiled = CompiledNetworks(unique.values())
+            self._red_net_index = np.array([net_index[id(net)] for net in self._ai_red])
+            self._blue_net_index = np.array([net_index[id(net)] for net in self._ai_blue])
+
+        # starting conditions of every game
+        self._red_loc = np.tile(self._board.red_start, (n, 1))
+        self._blue_loc = np.tile(self._board.blue_start, (n, 1))
+        self._red_aim = np.tile(self._board.red_dir, (n, 1))
+        self._blue_aim = np.tile(self._board.blue_dir, (n, 1))
+        p_bodies = walls(self._board.cells)
+        self._p_bodies = np.repeat(p_bodies[np.newaxis], n, axis=0)
+        self._rays = np.repeat(RayIndex(p_bodies).as_array()[:, np.newaxis], n, axis=1)
+        self._state = np.full(n, self.ONGOING)
+        self._time = np.zeros(n, dtype=int)
+
+
+    def __len__(self):
+        return len(self._state)
+
+
+    # play every game until it ends, returns the number of lockstep ticks that were run
+    def start_game(self):
+        ticks = 0
+        while (self._state == self.ONGOING).any():
+            self._update()
+            ticks += 1
+        return ticks
+
+
+    def _update(self):
+        games = np.flatnonzero(self._state == self.ONGOING)
+        self._time[games] += 1
+
+        red_loc = self._red_loc[games]
+        blue_loc = self._blue_loc[games]
+
+        """PLACE SNAKE HEADS INTO BODY"""
+        self._p_bodies[games, red_loc[:, 0], red_loc[:, 1]] = True
+        self._p_bodies[games, blue_loc[:, 0], blue_loc[:, 1]] = True
+        fill_batch(self._rays, games, red_loc[:, 0], red_loc[:, 1])
+        fill_batch(self._rays, games, blue_loc[:, 0], blue_loc[:, 1])
+
+
+        """GET PERCEPTS FOR CURRENT GAME STATES"""
+        red_percepts, blue_percepts = dist_totals_batch(red_loc, blue_loc, games, self._rays)
+
+
+        """ASK AI WHAT DIRECTION TO MOVE"""
+        if self._compiled is not None:
+            red_actions = _choose_actions(self._compiled.activate(self._red_net_index[games], red_percepts))
+            blue_actions = _choose_actions(self._compiled.activate(self._blue_net_index[games], blue_percepts))
+        else:
+            red_actions = np.array([_choose_action(self._ai_red[g].activate(p))
+                                    for g, p in zip(games, red_percepts.tolist())], dtype=int)
+            blue_actions = np.array([_choose_action(self._ai_blue[g].activate(p))
+                                     for g, p in zip(games, blue_percepts.tolist())], dtype=int)
+
+        self._red_aim[games] = self._turn(self._red_aim[games], red_actions)
+        self._blue_aim[games] = self._turn(self._blue_aim[games], blue_actions)
+
+
+        """ADVANCE SNAKES BASED ON GIVEN DIRECTION"""
+        red_loc += self._red_aim[games]
+        blue_loc += self._blue_aim[games]
+        self._red_loc[games] = red_loc
+        self._blue_loc[games] = blue_loc
+
+
+        """END GAMES WHERE EITHER SNAKE DIED"""
+        red_alive = ~self._p_bodies[games, red_loc[:, 0], red_loc[:, 1]]
+        blue_alive = ~self._p_bodies[games, blue_loc[:, 0], blue_loc[:, 1]]
+        collided = (red_loc == blue_loc).all(axis=1)
+
+        state = np.full(len(games), self.ONGOING)
+        state[~blue_alive] = self.RED_WON
+        state[~red_alive] = self.BLUE_WON
+        state[collided | (~red_alive & ~blue_alive)] = self.TIE
+        self._state[games] = state
+
+
+    # new aims after the chosen actions, 180 and 0 degree direction changes are ignored like TronCore._movep1
+    def _turn(self, aims, actions):
+        turning = actions >= 0
+        new_aims = self.DIRECTIONS[np.where(turning, actions, 0)]
+        turning &= (new_aims[:, 0] != aims[:, 0]) & (new_aims[:, 1] != aims[:, 1])
+        return np.where(turning[:, np.newaxis], new_aims, aims)
+
+
+    def get_state(self, i):
+        return self.GameState(int(self._state[i]))
+
+
+    def get_time(self, i):
+        return int(self._time[i])
+
+
+    def get_outcome(self, i):
+        return GameOutcome(self.get_state(i), self.get_time(i),
+                           tuple(self._red_loc[i].tolist()), tuple(self._blue_loc[i].tolist()))
+
+
+    # a finished TronCore with the final state of game i, so the fitness functions can be used on it
+    def get_game(self, i):
+        return TronCore.finished(*self.get_outcome(i), board=self._board)
+
+
+# TronCore.choose_action, with -1 if the AI keeps going straight
+def _choose_action(controls):
+    action = TronCore.choose_action(controls)
+    if action is None: return -1
+    return action
+
+
+# _choose_action for an (N, outputs) array of controls
+def _choose_actions(controls):
+    return np.where(controls.max(axis=1) == 0, -1, controls.argmax(axis=1))
@@ -1,166 +1,423 @@
+import argparse
 import os
 import pickle
 
-from TronGame import TronGame
+from TronCore import TronCore
+from board import Board
+from BatchTronGame import BatchTronGame
+from parallel_eval import WorkerPool
+from distributed_eval import Coordinator, PORT
+from matchmaking import RoundRobin
+from network_cache import NetworkCache
+from outcome_cache import genome_hash, settings_key
+import fitness
+import ai_inputs
+from profiler import ProfileReporter, timed
+from training_stats import StatsReporter
+import checkpoint
 import neat
-import turtle
 
-# create screen
-main_screen = turtle.Screen()
-main_screen.setup(402, 402)
+# screen the graphical generations are shown on, created when the first one is played
+# turtle is only imported then, so headless training never starts Tk and runs without a display
+main_screen = None
 
-# number of generations to train
-GENERATIONS = 50
-
-small_gen = 10
 
-def run(config_file):
-    # load config file into memory
-    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
-                                neat.DefaultSpeciesSet, neat.DefaultStagnation, config_file)
+def get_screen():
+    global main_screen
+    if main_screen is None:
+        import turtle
+        main_screen = turtle.Screen()
+        main_screen.setup(402, 402)
+    return main_screen
 
-    # create population
-    pop = neat.population.Population(config)
+# number of generations to train
+GENERATIONS = 100
+
+# generations the best genome so far is saved after, as winner<generation>.pkl in OUT_DIR
+# the best genome at the end of training is saved as winnerALL.pkl
+SNAPSHOTS = [1, 10, 20, 30, 40, 50]
+OUT_DIR = "."
+
+# draw the games of the last generation with turtle, False never imports it
+RENDER_LAST = True
+
+# number of worker processes used to play each generation's games, 1 plays them all in this process
+# the processes are started when the first games are played and kept until run() ends
+WORKERS = 1
+worker_pool = None
+
+
+def get_worker_pool():
+    global worker_pool
+    if worker_pool is not None and worker_pool.workers != WORKERS: close_worker_pool()
+    if worker_pool is None: worker_pool = WorkerPool(WORKERS)
+    return worker_pool
+
+
+def close_worker_pool():
+    global worker_pool
+    if worker_pool is not None: worker_pool.close()
+    worker_pool = None
+
+# play each generation's games on the workers connected to a distributed_eval.Coordinator, None to not
+# start workers on any machine with python distributed_eval.py HOST PORT, results are the same as a serial run
+# the coordinator and its workers need the same secret key in the TRON_AUTHKEY environment variable,
+# the coordinator listens on localhost unless it is given another host
+# COORDINATOR = Coordinator(port=PORT)
+COORDINATOR = None
+
+# play all of a generation's games in lockstep as one BatchTronGame instead of one game at a time
+BATCHED = False
+
+# board every game is played on, its size and start positions can be changed here
+# boards larger than board.SPARSE_CELLS store bodies sparsely, endgame and batched games need a dense board
+BOARD = Board(cells=25)
+
+# end games early once the snakes are cut off from each other, None plays every tick
+# endgame.RESOLVE decides them from which snake has more room, endgame.FAST_FORWARD plays each snake on alone
+# both are slower than exact play until the snakes last long enough to separate often, so it is off by default,
+# run endgame.py to see how much either one saves and how much fitness changes, batched games always play every tick
+# import endgame
+# ENDGAME = endgame.RESOLVE
+ENDGAME = None
+
+# record every game that is played into a replay archive, None records nothing
+# cached outcomes and batched games are not recorded, watch them again with test.py or read them with replay.py
+# from replay import ReplayWriter
+# REPLAYS = ReplayWriter("replays")
+REPLAYS = None
+
+# time every phase of eval_genomes and of the ticks played in this process, None to not profile
+# each generation's totals are appended to PROFILE_PATH in OUT_DIR as a line of json, or as csv rows if it ends in .csv
+# from profiler import Profiler
+# PROFILER = Profiler()
+PROFILER = None
+PROFILE_PATH = "profile.ndjson"
+
+# print how many networks each generation built and how many times they were reused
+REPORT_NETWORKS = False
+
+# file in OUT_DIR every generation's fitness, species and game statistics are appended to, None to not save them
+# it is written as csv if it ends in .csv and as a json object per line otherwise, plot it with training_stats.py
+# only the last STATS_WINDOW generations are kept in memory, so runs of any length use the same memory
+STATS_PATH = "stats.ndjson"
+STATS_WINDOW = 100
+# the StatsReporter of the run, set by run()
+STATS = None
+
+# directory in OUT_DIR the population is checkpointed to every CHECKPOINT_EVERY generations, None to not checkpoint
+# checkpoints are written on a background thread, only the newest CHECKPOINT_KEEP are kept
+# resume a run from the newest one with python NeatManager.py --resume, it goes on exactly as if it never stopped
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_EVERY = 5
+CHECKPOINT_KEEP = 3
+
+"""
+    CHOOSE MATCHMAKING
+    Decides which genomes play each other, fitness is averaged over the games each genome actually played.
+    Only leave one of the following assignments uncommented.
+"""
+# every genome plays every other genome, (N - 1) * 2 games per genome
+MATCHMAKER = RoundRobin()
+
+# every genome is paired with k random opponents, about 4k games per genome no matter the population size
+# from matchmaking import RandomOpponents
+# MATCHMAKER = RandomOpponents(5)
+
+# genomes with similar scores are paired over a number of rounds, 2 games per genome per round
+# from matchmaking import Swiss
+# MATCHMAKER = Swiss(6)
+
+# a round robin that stops playing genomes that cannot be among the survival_threshold of their species,
+# every 10th generation plays the whole round robin to report how many survivors racing picked differently
+# from matchmaking import Racing
+# MATCHMAKER = Racing(opponents_per_round=4, audit_every=10)
+
+# any of the above plus games against a hall of fame of the best genome of recent generations
+# from matchmaking import HallOfFame, RandomOpponents
+# MATCHMAKER = HallOfFame(RandomOpponents(5), 10)
+
+# outcomes of games already played, reused when the same pair of genomes meets again with the same BOARD, ENDGAME
+# and PERCEPTS, None plays every game
+# pairings rarely repeat with the other matchmakers, the cache only pays for itself with the hall of fame:
+# from outcome_cache import OutcomeCache
+# OUTCOME_CACHE = OutcomeCache(200000)
+OUTCOME_CACHE = None
+
+"""
+    CHOOSE FITNESS FUNCTION
+    Set fitness_function in the [TronFitness] section of the config file to one of the names in fitness.py,
+    run() reads it from there:
+    wojtek_wall, wojtek_wall_updated, alex_winner_loser, alex_wojtek_combined, basic or no_time
+"""
+FITNESS = fitness.DEFAULT
+
+"""
+    CHOOSE PERCEPTS
+    Set percept_set in the [TronPercepts] section of the config file to one of the names in ai_inputs.PERCEPT_SETS,
+    run() reads it from there and gives genomes as many inputs as it has:
+    basic (8 inputs, what the saved winners were trained with) or territory (13 inputs, dense boards only)
+"""
+PERCEPTS = ai_inputs.BASIC
+
+"""
+Train a population with the settings in config_file, or go on training the one checkpointed at resume,
+a checkpoint file or a directory to take the newest checkpoint in.
+A resumed run keeps the config, fitness function, percepts and matchmaker it was checkpointed with.
+"""
+def run(config_file, resume=None):
+    global FITNESS, PERCEPTS, STATS, MATCHMAKER
+
+    if resume is None:
+        # load config file into memory
+        config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                    neat.DefaultSpeciesSet, neat.DefaultStagnation, config_file)
+        FITNESS = fitness.from_config(config_file)
+        PERCEPTS = ai_inputs.from_config(config_file)
+        ai_inputs.set_num_inputs(config.genome_config, PERCEPTS)
+
+        # create population
+        pop = neat.population.Population(config)
+    else:
+        pop, saved = checkpoint.restore(resume)
+        FITNESS = saved["fitness"]
+        PERCEPTS = saved["percepts"]
+        MATCHMAKER = saved["matchmaker"]
+        eval_genomes.gen = pop.generation
+        print("Resuming from generation {0}".format(pop.generation))
+
+    # racing takes the survival threshold from the config and needs the species of each genome,
+    # a hall of fame passes them on to the strategy it adds to
+    if hasattr(MATCHMAKER, "use_species"): MATCHMAKER.use_species(pop.config, pop.species)
 
     # enable stats output
     pop.add_reporter(neat.StdOutReporter(True))
-    pop.add_reporter(neat.StatisticsReporter())
-
-    # begin training, second param is max generation number
-
-    # Trains one generation and saves it
-    winner1 = pop.run(eval_genomes, 1)
-
-    # Trains in increments of 10 generations and saves each one
-    winner10 = pop.run(eval_genomes, small_gen)
-
-    winner20 = pop.run(eval_genomes, small_gen)
-
-    winner30 = pop.run(eval_genomes, small_gen)
-
-    winner40 = pop.run(eval_genomes, small_gen)
-
-    winner50 = pop.run(eval_genomes, small_gen)
-
-    # Trains for a final 50 generations and saves it
-    winnerALL = pop.run(eval_genomes, GENERATIONS)
-
-    # after end of training, store best fit to file
-    with open("winnerALL.pkl", "wb") as f:
-        pickle.dump(winnerALL, f)  # change to pop if you want best in generation
-        f.close()
-
-    with open("winner1.pkl", "wb") as f:
-        pickle.dump(winner1, f)
-        f.close()
-
-    with open("winner10.pkl", "wb") as f:
-        pickle.dump(winner10, f)
-        f.close()
-
-    with open("winner20.pkl", "wb") as f:
-        pickle.dump(winner20, f)
-        f.close()
-
-    with open("winner30.pkl", "wb") as f:
-        pickle.dump(winner30, f)
-        f.close()
-
-    with open("winner40.pkl", "wb") as f:
-        pickle.dump(winner40, f)
-        f.close()
+    if STATS_PATH is not None:
+        STATS = StatsReporter(os.path.join(OUT_DIR, STATS_PATH), STATS_WINDOW, append=resume is not None)
+        if resume is not None: STATS.keep_before(pop.generation)
+        pop.add_reporter(STATS)
+    if PROFILER is not None:
+        TronCore.PROFILER = PROFILER
+        pop.add_reporter(ProfileReporter(PROFILER, os.path.join(OUT_DIR, PROFILE_PATH),
+                                         "csv" if PROFILE_PATH.endswith(".csv") else "ndjson", append=resume is not None))
+    checkpoints = None
+    if CHECKPOINT_DIR is not None:
+        checkpoints = checkpoint.CheckpointReporter(pop, os.path.join(OUT_DIR, CHECKPOINT_DIR), CHECKPOINT_EVERY,
+                                                    CHECKPOINT_KEEP, extra=lambda: {"fitness": FITNESS,
+                                                                                    "percepts": PERCEPTS,
+                                                                                    "matchmaker": MATCHMAKER})
+        pop.add_reporter(checkpoints)
+
+    # train in stages that end at each snapshot, and save the best genome so far at the end of each one
+    done = pop.generation
+    try:
+        for generation in sorted(set(n for n in SNAPSHOTS if 0 < n < GENERATIONS)) + [GENERATIONS]:
+            if generation <= done: continue
+            winner = pop.run(eval_genomes, generation - done)
+            done = generation
+
+            names = ["winner{0}.pkl".format(generation)] if generation in SNAPSHOTS else []
+            # after end of training, store best fit to file
+            if generation == GENERATIONS: names.append("winnerALL.pkl")
+            for name in names:
+                with open(os.path.join(OUT_DIR, name), "wb") as f:
+                    pickle.dump(winner, f)  # change to pop if you want best in generation
+    finally:
+        # wait for the last checkpoint to be written
+        if checkpoints is not None: checkpoints.close()
+        close_worker_pool()
 
-    with open("winner50.pkl", "wb") as f:
-        pickle.dump(winner50, f)
-        f.close()
 
 # this function evaluates each genome, giving it a fitness value
-# It does this by having it play tron against other genomes.
-# Each genome will play 2 games against every other genome, once as red, then as blue.
+# It does this by having it play tron against other genomes picked by MATCHMAKER.
+# Each pairing plays 2 games, once as red, then as blue.
 # After each game, the fitness from that specific game will be calculated based on if they won or lost,
 # as well as how long the game lasted. (and possible other factors)
-# The fitness from every game for a genome will then be added together
+# The fitness from every game for a genome will then be averaged
 # to form the genomes total fitness for that generation
 def eval_genomes(genomes, config):
     eval_genomes.gen += 1
-    # default every genomes fitness to 0
-    for _, genome in genomes:
-        genome.fitness = 0
-
-
-    # genomes is a list of genome_id's and genome's,
-    for red_id, red_genome in genomes:
-        for blue_id, blue_genome in genomes:
-
-            # skip if the same genome
-            if red_id == blue_id: continue
-
-            # create a neural network of the current genomes
-            red_net = neat.nn.FeedForwardNetwork.create(red_genome, config)
-            blue_net = neat.nn.FeedForwardNetwork.create(blue_genome, config)
-
-
-            # run the game
-            # graphically show the last however many generations
-            if eval_genomes.gen > (small_gen * 5) + GENERATIONS:  # calculation: total number of generations ran
-
-                game = TronGame(graphics_enable=True, screen=main_screen, keep_window_open=False,
-                                ai_red_net=red_net, ai_blue_net=blue_net,
-                                debug_text=False, end_text=False, delay=0)
-                game.start_game()
-                main_screen.clear()
-
-            else:
-                game = TronGame(graphics_enable=False, screen=None, keep_window_open=False,
-                                ai_red_net=red_net, ai_blue_net=blue_net,
-                                debug_text=False, end_text=False, delay=0)
-                game.start_game()
-
-            #The following adds the per game fitness to the agents total fitness over all games
-
-            """
-                CHOOSE FITNESS FUNCTION
-                Each 2 line segment designates a fitness function to use,
-                only comment out one 2 line segment at a time.
-            """
-            # calculate fitness based on time, winning points, and extra winning points if opposition ran into grid wall
-            # red_genome.fitness += game.get_fitness_wojtek_wall()[0]
-            # blue_genome.fitness += game.get_fitness_wojtek_wall()[1]
-
-            # This function is the same as Wojtek's but punishes the loser instead of rewarding the winner when they hit a wall.
-            red_genome.fitness += game.get_fitness_wojtek_wall_updated()[0]
-            blue_genome.fitness += game.get_fitness_wojtek_wall_updated()[1]
-
-            # Calculate fitness using winner and loser functions, see TronGame.py for more info
-            # red_genome.fitness += game.get_fitness_alex_winner_loser()[0]
-            # blue_genome.fitness += game.get_fitness_alex_winner_loser()[1]
-
-            # calculate fitness using both wall and winner loser functions
-            # red_genome.fitness += game.get_fitness_alex_wojtek_combined()[0]
-            # blue_genome.fitness += game.get_fitness_alex_wojtek_combined()[1]
-
-            # this fitness function gives both players points for time alive, as well as 500 points for the winner
-            # red_genome.fitness += game.get_fitness_basic()[0]
-            # blue_genome.fitness += game.get_fitness_basic()[1]
-
-            # this fitness function only rewards the winner 500 points, and give no points based on time spent alive
-            # red_genome.fitness += game.get_fitness_no_time()[0]
-            # blue_genome.fitness += game.get_fitness_no_time()[1]
-
 
+    # every genome's network is built once for this generation and reused for all of its games
+    nets = NetworkCache(config)
+
+    # total fitness and number of games of every genome in the population,
+    # opponents from outside the population (the hall of fame) are not scored
+    totals = dict((genome_id, 0) for genome_id, _ in genomes)
+    games_played = dict((genome_id, 0) for genome_id, _ in genomes)
+
+    with timed(PROFILER, "matchmaking"): MATCHMAKER.start_generation(genomes)
+    while True:
+        scores = dict((genome_id, totals[genome_id] / max(1, games_played[genome_id])) for genome_id in totals)
+        with timed(PROFILER, "matchmaking"): games = MATCHMAKER.next_round(scores)
+        if not games: break
+
+        # every game of the round is scored at once
+        outcomes = get_outcomes(games, config, nets)
+        if STATS is not None: STATS.add_outcomes(outcomes)
+        with timed(PROFILER, "fitness"):
+            game_fitness = fitness.score(FITNESS, outcomes, BOARD).tolist()
+            for (red_id, _, blue_id, _), (red_fitness, blue_fitness) in zip(games, game_fitness):
+                if red_id in totals:
+                    totals[red_id] += red_fitness
+                    games_played[red_id] += 1
+                if blue_id in totals:
+                    totals[blue_id] += blue_fitness
+                    games_played[blue_id] += 1
+        with timed(PROFILER, "matchmaking"): MATCHMAKER.add_results(games, game_fitness)
 
     # divide fitness by the number of games played
-    for _, genome in genomes:
-        genome.fitness /= (len(genomes) - 1)*2
+    for genome_id, genome in genomes:
+        genome.fitness = totals[genome_id]
+        if games_played[genome_id]: genome.fitness /= games_played[genome_id]
+
+    with timed(PROFILER, "matchmaking"): MATCHMAKER.end_generation(genomes)
+
+    # networks are built while the games are played, so this is part of play
+    if PROFILER is not None:
+        builds, _, build_time = nets.get_stats()
+        PROFILER.add("networks", build_time, builds)
+
+    if REPORT_NETWORKS: print(nets.report())
+    if hasattr(MATCHMAKER, "report"): print(MATCHMAKER.report())
+    if OUTCOME_CACHE is not None: print(OUTCOME_CACHE.report())
+    if REPLAYS is not None: REPLAYS.flush()
+
+
+# the GameOutcome of every game, taken from OUTCOME_CACHE where the same genomes already played each other
+def get_outcomes(games, config, nets):
+    if OUTCOME_CACHE is None or graphical_generation():
+        with timed(PROFILER, "play"): return play_games(games, config, nets)
+
+    with timed(PROFILER, "outcome_cache"):
+        hashes = {}
+        for red_id, red_genome, blue_id, blue_genome in games:
+            if red_id not in hashes: hashes[red_id] = genome_hash(red_genome)
+            if blue_id not in hashes: hashes[blue_id] = genome_hash(blue_genome)
+
+        settings = settings_key(BOARD, ENDGAME, PERCEPTS)
+        outcomes = [OUTCOME_CACHE.get(settings, hashes[red_id], hashes[blue_id]) for red_id, _, blue_id, _ in games]
+
+    # play the games that are not cached yet, then cache them
+    missing = [i for i, outcome in enumerate(outcomes) if outcome is None]
+    with timed(PROFILER, "play"): played = play_games([games[i] for i in missing], config, nets)
+    with timed(PROFILER, "outcome_cache"):
+        for i, outcome in zip(missing, played):
+            red_id, _, blue_id, _ = games[i]
+            OUTCOME_CACHE.put(settings, hashes[red_id], hashes[blue_id], outcome)
+            outcomes[i] = outcome
+
+    return outcomes
+
+
+# graphically show the last generation
+def graphical_generation():
+    return RENDER_LAST and eval_genomes.gen == GENERATIONS
+
+
+# play a list of (red_id, red_genome, blue_id, blue_genome) games,
+# returns the GameOutcome of every game in the same order as the games
+def play_games(games, config, nets):
+    if not games: return []
+    graphical = graphical_generation()
+
+    # spread the games over the connected workers
+    if COORDINATOR is not None and not graphical:
+        if REPLAYS is None: return COORDINATOR.play_matchups(games, config, nets, ENDGAME, board=BOARD,
+                                                             percept_set=PERCEPTS)
+
+        results, moves = COORDINATOR.play_matchups(games, config, nets, ENDGAME, record=True, board=BOARD,
+                                                   percept_set=PERCEPTS)
+        for (red_id, _, blue_id, _), outcome, game_moves in zip(games, results, moves):
+            REPLAYS.add_moves(eval_genomes.gen, red_id, blue_id, BOARD.cells, BOARD.start, game_moves, outcome)
+        return results
+
+    # spread the games over a pool of worker processes
+    if WORKERS > 1 and not graphical:
+        # the workers keep the genomes and networks of this generation between its rounds
+        if REPLAYS is None: return get_worker_pool().play_matchups(games, config, nets, ENDGAME, board=BOARD,
+                                                                   percept_set=PERCEPTS, generation=eval_genomes.gen)
+
+        results, moves = get_worker_pool().play_matchups(games, config, nets, ENDGAME, record=True, board=BOARD,
+                                                         percept_set=PERCEPTS, generation=eval_genomes.gen)
+        for (red_id, _, blue_id, _), outcome, game_moves in zip(games, results, moves):
+            REPLAYS.add_moves(eval_genomes.gen, red_id, blue_id, BOARD.cells, BOARD.start, game_moves, outcome)
+        return results
+
+    # play every game together in one batch
+    if BATCHED and not graphical:
+        # the networks are compiled into numpy matrices, their outputs match activate() within float rounding
+        batch = BatchTronGame([nets.get(red_id, red_genome) for red_id, red_genome, _, _ in games],
+                              [nets.get(blue_id, blue_genome) for _, _, blue_id, blue_genome in games],
+                              compile_nets=True, board=BOARD, percept_set=PERCEPTS)
+        batch.start_game()
+        return [batch.get_outcome(i) for i in range(len(games))]
+
+    results = []
+    for red_id, red_genome, blue_id, blue_genome in games:
+
+        # get the neural networks of the current genomes
+        red_net = nets.get(red_id, red_genome)
+        blue_net = nets.get(blue_id, blue_genome)
+
+        # run the game
+        if graphical:
+            from TronGame import TronGame
+            game = TronGame(graphics_enable=True, screen=get_screen(), keep_window_open=False,
+                            ai_red_net=red_net, ai_blue_net=blue_net,
+                            debug_text=False, end_text=False, delay=0, record=REPLAYS is not None, board=BOARD,
+                            percept_set=PERCEPTS)
+            game.start_game()
+            get_screen().clear()
+
+        else:
+            game = TronCore(ai_red_net=red_net, ai_blue_net=blue_net, endgame=ENDGAME, record=REPLAYS is not None,
+                            board=BOARD, percept_set=PERCEPTS)
+            game.run_to_end()
+
+        if REPLAYS is not None: REPLAYS.add(eval_genomes.gen, red_id, blue_id, game)
+        results.append(game.get_outcome())
+
+    return results
 
 
 # static variable
 eval_genomes.gen = 0
 
-# get config file path, then run neat
+# train from the command line, python NeatManager.py --help lists the options
+# the settings above that have no option can still be changed in this file
 if __name__ == "__main__":
     # get directory of repo
-    local_dir = os.path.dirname(__file__)
-    # add on the name of the neat config file
-    config_path = os.path.join(local_dir, "config-feedforward.txt")
-    run(config_path)
+    local_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Train Tron agents with NEAT")
+    parser.add_argument("--config", default=os.path.join(local_dir, "config-feedforward.txt"),
+                        help="neat config file")
+    parser.add_argument("--generations", type=int, default=GENERATIONS, help="number of generations to train")
+    parser.add_argument("--snapshots", type=int, nargs="*", default=SNAPSHOTS,
+                        help="generations the best genome is saved after, as winner<generation>.pkl")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="worker processes that play the games")
+    parser.add_argument("--listen", metavar="HOST:PORT",
+                        help="play the games on workers that connect to this address, see distributed_eval.py, "
+                             "the workers need the same secret key in TRON_AUTHKEY")
+    parser.add_argument("--out", default=OUT_DIR, help="directory the winner, stats and checkpoint files are saved in")
+    parser.add_argument("--headless", action="store_true",
+                        help="do not draw the last generation, turtle is never imported")
+    parser.add_argument("--resume", nargs="?", const="", metavar="CHECKPOINT",
+                        help="go on training from a checkpoint, or from the newest one in OUT/checkpoints")
+    args = parser.parse_args()
+
+    GENERATIONS = args.generations
+    SNAPSHOTS = args.snapshots
+    WORKERS = args.workers
+    OUT_DIR = args.out
+    if args.headless: RENDER_LAST = False
+    if args.listen:
+        host, _, port = args.listen.rpartition(":")
+        COORDINATOR = Coordinator(host or "127.0.0.1", int(port or PORT))
+    os.makedirs(OUT_DIR, exist_ok=True)
+    try:
+        if args.resume is None: run(args.config)
+        else: run(args.config, args.resume or os.path.join(OUT_DIR, CHECKPOINT_DIR))
+    finally:
+        if COORDINATOR is not None: COORDINATOR.close()
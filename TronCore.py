@@ -0,0 +1,467 @@
+"""Tron, a classic arcade game.
+   This is the headless simulation core of the game, each object is a game instance.
+   It has no graphics and never sleeps, TronGame draws it with turtle.
+"""
+from freegames import vector
+from ai_inputs import dist_totals, percepts, territory_totals, territory_percepts, BASIC, TERRITORY
+from board import DEFAULT_BOARD
+import endgame
+from enum import Enum
+from collections import namedtuple
+import copy
+
+
+# final state of a game, enough to calculate any fitness function without playing it again
+# head locations are (x, y) cells
+GameOutcome = namedtuple("GameOutcome", ["state", "time", "red_loc", "blue_loc"])
+
+# state of a game at one tick from TronCore.snapshot(), the game can be taken back to it with restore()
+# locs and aims are (x, y) tuples, trail, ray_log and moves are how long the game's undo logs were,
+# regions is the territory's list of regions if it keeps one, recheck is whether the endgame checks the next tick
+GameSnapshot = namedtuple("GameSnapshot", ["state", "time", "red_loc", "red_aim", "blue_loc", "blue_aim",
+                                           "trail", "ray_log", "moves", "regions", "separated_at", "solo_ticks",
+                                           "recheck"])
+
+
+class TronCore:
+
+    """GAME CONSTANTS"""
+    # the size of the board and where the snakes start are set by the board.Board a game is played on
+    # pixel size of each grid cell, snakes move one cell per "frame"
+    SNAKE_SPEED = 4
+    # pixel y of the bottom row of cells, rows sit half a cell above the pixel grid lines
+    ROW_OFFSET = 2
+
+    # enum class for game states
+    class GameState(Enum):
+        ongoing = 1
+        red_won = 2
+        blue_won = 3
+        tie = 4
+
+    # direction of each action: up, down, left, right, in the same order as the AI outputs
+    DIRECTIONS = [(0, 1), (0, -1), (-1, 0), (1, 0)]
+
+    # profiler.Profiler that times the phases of every tick, None to not profile
+    PROFILER = None
+
+
+    # a player without a net is controlled through step() or _movep1()/_movep2()
+    # a net that has an act(game, red) method, like search_agent.SearchAgent, is asked for an action with it
+    # instead of activate(percepts), so it can look at the whole game
+    # endgame is None to play every tick, or one of endgame.MODES to end games between two AIs
+    # once the snakes are cut off from each other, see endgame.py
+    # record keeps the direction both snakes moved in every tick, see get_moves() and replay.py
+    # board is the board.Board to play on, DEFAULT_BOARD if None
+    # percept_set is the name of the percepts the AIs are given, one of ai_inputs.PERCEPT_SETS
+    def __init__(self, ai_red_net=None, ai_blue_net=None, endgame=None, record=False, board=None,
+                 percept_set=BASIC):
+        self._board = board if board is not None else DEFAULT_BOARD
+        if endgame is not None and self._board.sparse:
+            raise ValueError("The endgame flood fills the board, it can only be used on dense boards")
+        if percept_set == TERRITORY and self._board.sparse:
+            raise ValueError("The territory percepts flood fill the board, they can only be used on dense boards")
+        self._ai_red = ai_red_net
+        self._ai_blue = ai_blue_net
+        self._red_act = getattr(ai_red_net, "act", None)
+        self._blue_act = getattr(ai_blue_net, "act", None)
+        self._endgame = endgame
+        self._record = record
+        self._percept_set = percept_set
+        self.reset()
+
+
+    """
+    put the game back to its starting conditions
+    start is a (red_loc, red_aim, blue_loc, blue_aim) tuple of (x, y) cells and directions
+    to start from instead of the board's, like the start of a replay
+    """
+    def reset(self, start=None):
+        if start is None: start = self._board.start
+        self._start = start
+        # starting conditions that have to be copied for each game
+        self._red_loc = vector(*start[0])
+        self._red_aim = vector(*start[1])
+        self._blue_loc = vector(*start[2])
+        self._blue_aim = vector(*start[3])
+        # how far every cell can see is kept up to date as the snakes fill cells
+        self._p_bodies = self._board.new_bodies()
+        self._rays = self._board.new_rays(self._p_bodies)
+        # regions of free cells, only kept for the territory percepts
+        self._territory = self._board.new_territory(self._p_bodies) if self._percept_set == TERRITORY else None
+        self._state = self.GameState.ongoing
+        self._time = 0
+        # tick the snakes were found to be separated at and ticks played alone after it, if the endgame ended the game
+        self._separated_at = None
+        self._solo_ticks = 0
+        # whether the heads placed last might have split the free cells, and whether the endgame checks the next tick
+        self._cut = False
+        self._recheck = False
+        # (red direction, blue direction) of every tick as indexes into DIRECTIONS, if recording
+        self._moves = [] if self._record else None
+        # undo logs of the cells filled and the rays they changed, kept from the first snapshot() on
+        self._trail = None
+        self._ray_log = None
+
+        # the cells a snake's head is on are already part of its body
+        self._place_heads()
+
+
+    # create an already finished game from its final state or GameOutcome,
+    # used to calculate fitness of games played elsewhere
+    @classmethod
+    def finished(cls, state, time, red_loc, blue_loc, board=None):
+        game = cls(board=board)
+        game._state = state
+        game._time = time
+        game._red_loc = vector(red_loc[0], red_loc[1])
+        game._blue_loc = vector(blue_loc[0], blue_loc[1])
+        return game
+
+
+    def get_board(self):
+        return self._board
+
+
+    # the bodies of the game so far, indexed [x, y] with walls and heads included
+    def get_bodies(self):
+        return self._p_bodies
+
+
+    # where the heads are and the directions they are moving in, in the form reset() takes
+    def get_heads(self):
+        return ((self._red_loc.x, self._red_loc.y), (self._red_aim.x, self._red_aim.y),
+                (self._blue_loc.x, self._blue_loc.y), (self._blue_aim.x, self._blue_aim.y))
+
+
+    # the starting conditions this game was played from, in the form reset() takes
+    def get_start(self):
+        return self._start
+
+
+    # the directions both snakes moved in every tick so far, None unless the game records
+    def get_moves(self):
+        return self._moves
+
+
+    def get_outcome(self):
+        return GameOutcome(self._state, self._time,
+                           (self._red_loc.x, self._red_loc.y), (self._blue_loc.x, self._blue_loc.y))
+
+
+    # (tick the snakes were separated at, ticks played alone after it) if the endgame ended this game, else None
+    def get_endgame(self):
+        if self._separated_at is None: return None
+        return self._separated_at, self._solo_ticks
+
+
+    """
+    Save the state of the game in a few numbers, restore() takes it back there.
+    The first snapshot turns on the undo logs, from then on every filled cell is logged
+    so restoring only has to undo the ticks played since, instead of copying the whole board.
+    """
+    def snapshot(self):
+        if self._trail is None:
+            self._trail = []
+            self._ray_log = []
+        return GameSnapshot(self._state, self._time,
+                            (self._red_loc.x, self._red_loc.y), (self._red_aim.x, self._red_aim.y),
+                            (self._blue_loc.x, self._blue_loc.y), (self._blue_aim.x, self._blue_aim.y),
+                            len(self._trail), len(self._ray_log),
+                            None if self._moves is None else len(self._moves),
+                            None if self._territory is None else list(self._territory.regions),
+                            self._separated_at, self._solo_ticks, self._recheck)
+
+
+    # take the game back to a snapshot of it, snapshots taken after that one can no longer be restored
+    def restore(self, snapshot):
+        trail = self._trail
+        while len(trail) > snapshot.trail:
+            self._p_bodies[trail.pop()] = False
+        self._rays.undo(self._ray_log, snapshot.ray_log)
+        if self._territory is not None: self._territory.regions = list(snapshot.regions)
+        if self._moves is not None: del self._moves[snapshot.moves:]
+
+        self._state = snapshot.state
+        self._time = snapshot.time
+        self._red_loc = vector(*snapshot.red_loc)
+        self._red_aim = vector(*snapshot.red_aim)
+        self._blue_loc = vector(*snapshot.blue_loc)
+        self._blue_aim = vector(*snapshot.blue_aim)
+        self._separated_at = snapshot.separated_at
+        self._solo_ticks = snapshot.solo_ticks
+        self._recheck = snapshot.recheck
+
+
+    # an independent copy of the game that plays on from the same state, without its undo logs
+    def clone(self):
+        game = copy.copy(self)
+        game._red_loc = self._red_loc.copy()
+        game._red_aim = self._red_aim.copy()
+        game._blue_loc = self._blue_loc.copy()
+        game._blue_aim = self._blue_aim.copy()
+        game._p_bodies = self._p_bodies.copy()
+        game._rays = self._board.new_rays(game._p_bodies) if self._board.sparse else self._rays.copy()
+        if self._territory is not None: game._territory = self._territory.copy(game._p_bodies)
+        if self._moves is not None: game._moves = list(self._moves)
+        game._trail = None
+        game._ray_log = None
+        return game
+
+
+    # play until the game ends, returns the final state
+    def run_to_end(self):
+        while self._state == self.GameState.ongoing:
+            self._update()
+        return self._state
+
+
+    # percepts of both snakes for the current game state
+    def get_percepts(self):
+        if self._territory is not None:
+            return territory_totals(self._red_loc, self._blue_loc, self._rays, self._territory)
+        return dist_totals(self._red_loc, self._blue_loc, self._rays)
+
+
+    # index of the direction an AI chose from its outputs, None if it keeps going straight
+    @staticmethod
+    def choose_action(controls):
+        max_output = max(controls)
+        if max_output == 0: return None
+        return controls.index(max_output)
+
+
+    # ask the AI players what direction to move, then advance one tick
+    def _update(self):
+        profiler = self.PROFILER
+        if profiler is not None: profiler.mark()
+
+        # generate percepts info for ai if enabled
+        red_percepts, blue_percepts = None, None
+        if self._ai_red or self._ai_blue:
+            red_percepts, blue_percepts = self.get_percepts()
+        if profiler is not None: profiler.mark("percepts")
+
+        # The AI takes the game state as an input,
+        # the AI outputs the controls (game inputs) to be sent to the game
+        red_action, blue_action = None, None
+        if self._red_act is not None: red_action = self._red_act(self, True)
+        elif self._ai_red: red_action = self.choose_action(self._ai_red.activate(red_percepts))
+        if self._blue_act is not None: blue_action = self._blue_act(self, False)
+        elif self._ai_blue: blue_action = self.choose_action(self._ai_blue.activate(blue_percepts))
+        if profiler is not None: profiler.mark("activate")
+
+        state = self.step(red_action, blue_action)
+        if profiler is not None: profiler.mark("step")
+
+        if self._endgame is not None and self._ai_red and self._ai_blue and state == self.GameState.ongoing:
+            self._check_endgame()
+            if profiler is not None: profiler.mark("endgame")
+
+        if profiler is not None: profiler.end_tick(self._state != self.GameState.ongoing)
+        return self._state
+
+
+    # end the game early once the snakes are cut off from each other
+    # a head on the cell that split the free cells still touches both sides until it moves into one of them,
+    # so after every tick that might have split them the next tick is checked as well
+    def _check_endgame(self):
+        if not (self._cut or self._recheck): return
+        split = endgame.regions(self._p_bodies, self._red_loc, self._blue_loc)
+        self._recheck = self._cut and split is None
+        if split is None: return
+
+        self._separated_at = self._time
+        if self._endgame == endgame.RESOLVE:
+            self._resolve(*map(endgame.region_size, split))
+        else:
+            self._fast_forward()
+
+
+    # the snake with more room wins, assuming both fill their whole region and die on the tick after
+    # the heads stay where they were separated, so fitness that depends on where a snake died is an estimate
+    def _resolve(self, red_room, blue_room):
+        self._time += min(red_room, blue_room) + 1
+        if red_room > blue_room: self._state = self.GameState.red_won
+        elif blue_room > red_room: self._state = self.GameState.blue_won
+        else: self._state = self.GameState.tie
+
+
+    # keep playing each snake alone in its region until one of them dies, the one that dies loses
+    # rays never cross into the other region, so the only difference from playing on
+    # is that each snake sees its opponent's head where it was when they were separated
+    def _fast_forward(self):
+        red_seen = vector(self._red_loc.x, self._red_loc.y)
+        blue_seen = vector(self._blue_loc.x, self._blue_loc.y)
+
+        while self._state == self.GameState.ongoing:
+            self._time += 1
+            self._solo_ticks += 1
+            red_alive = self._move_alone(True, self._red_loc, self._red_aim, blue_seen)
+            blue_alive = self._move_alone(False, self._blue_loc, self._blue_aim, red_seen)
+            self._record_move()
+
+            if not red_alive and not blue_alive: self._state = self.GameState.tie
+            elif not red_alive: self._state = self.GameState.blue_won
+            elif not blue_alive: self._state = self.GameState.red_won
+
+
+    # move a snake that is playing alone one tick, returns if it is still alive
+    def _move_alone(self, red, loc, aim, other_loc):
+        act = self._red_act if red else self._blue_act
+        if act is not None:
+            action = act(self, red)
+        else:
+            net = self._ai_red if red else self._ai_blue
+            if self._territory is not None:
+                inputs = territory_percepts(loc, other_loc, self._rays, self._territory)
+            else:
+                inputs = percepts(loc, other_loc, self._rays)
+            action = self.choose_action(net.activate(inputs))
+        if action is not None: self._turn(aim, *self.DIRECTIONS[action])
+        loc.move(aim)
+        if self._p_bodies[loc.x, loc.y]: return False
+
+        self._p_bodies[loc.x, loc.y] = True
+        if self._trail is not None: self._trail.append((loc.x, loc.y))
+        self._rays.fill(loc.x, loc.y, self._ray_log)
+        if self._territory is not None: self._territory.fill(loc.x, loc.y)
+        return True
+
+
+    """
+    Advance the game one tick.
+    Actions are indexes into DIRECTIONS, or None to keep going in the current direction.
+    Returns the new game state.
+    """
+    def step(self, red_action=None, blue_action=None):
+
+        self._time += 1
+
+        """TURN SNAKES"""
+        if red_action is not None: self._movep1(*self.DIRECTIONS[red_action])
+        if blue_action is not None: self._movep2(*self.DIRECTIONS[blue_action])
+
+
+        """ADVANCE SNAKE BASED ON GIVEN DIRECTION"""
+        self._red_loc.move(self._red_aim)
+        self._blue_loc.move(self._blue_aim)
+        self._record_move()
+
+
+        """END GAME IF EITHER SNAKE DIED"""
+        # Check if either snake ran into a body
+        red_alive = not self._p_bodies[self._red_loc.x, self._red_loc.y]
+        blue_alive = not self._p_bodies[self._blue_loc.x, self._blue_loc.y]
+
+        # end game if either player is dead or hit each other
+        if self._red_loc == self._blue_loc or (not red_alive and not blue_alive):
+            self._state = self.GameState.tie
+        elif not red_alive:
+            self._state = self.GameState.blue_won
+        elif not blue_alive:
+            self._state = self.GameState.red_won
+        else:
+            # the new heads are part of the bodies from the next tick on
+            self._place_heads()
+
+        return self._state
+
+
+    def _record_move(self):
+        if self._moves is not None:
+            self._moves.append((self.DIRECTIONS.index((self._red_aim.x, self._red_aim.y)),
+                                self.DIRECTIONS.index((self._blue_aim.x, self._blue_aim.y))))
+
+
+    # each head is placed and indexed before the next one, the territory and endgame only notice a split
+    # that needs both new cells if the second cell is still free while the first one is filled
+    def _place_heads(self):
+        red_cut = self._place(self._red_loc)
+        blue_cut = self._place(self._blue_loc)
+        self._cut = red_cut or blue_cut
+
+
+    # fill the cell a head is on, returns whether it might have split the free cells,
+    # which is only worked out for the territory and endgame
+    def _place(self, loc):
+        self._p_bodies[loc.x, loc.y] = True
+        if self._trail is not None: self._trail.append((loc.x, loc.y))
+        self._rays.fill(loc.x, loc.y, self._ray_log)
+        if self._territory is None and self._endgame is None: return False
+
+        cut = endgame.may_cut(self._p_bodies, loc.x, loc.y)
+        if self._territory is not None: self._territory.fill(loc.x, loc.y, cut)
+        return cut
+
+
+    # pixel coordinates of a cell, only needed where the game meets turtle and the pixel based fitness functions
+    def _to_pixel(self, loc):
+        return vector(loc.x * self.SNAKE_SPEED, loc.y * self.SNAKE_SPEED + self.ROW_OFFSET)
+
+
+    def _print_grid(self):
+        for y in range(self._board.cells - 1, -1, -1):
+            for x in range(self._board.cells):
+                if self._p_bodies[x, y]:
+                    print('0', end='')
+                else:
+                    print('.', end='')
+            print()
+        print(self._red_loc, self._blue_loc)
+
+
+    def _movep1(self, x, y):
+        self._turn(self._red_aim, x, y)
+
+
+    def _movep2(self, x, y):
+        self._turn(self._blue_aim, x, y)
+
+
+    @staticmethod
+    def _turn(aim, x, y):
+        # ignore 180 degree directional changes
+        # 0 degree directional changes effectively do nothing as well
+        if x == aim.x or y == aim.y: return
+        aim.x = x
+        aim.y = y
+
+
+    """FITNESS FUNCTIONS"""
+    # [red fitness, blue fitness] of this game, from the function of the same name in fitness.py
+
+    def _fitness(self, name):
+        # fitness imports this module, so it is only imported once a game is scored
+        import fitness
+        return fitness.score(name, [self.get_outcome()], self._board)[0].tolist()
+
+
+    # calculate fitness based on time, winning points, and extra winning points if opposition ran into grid wall
+    def get_fitness_wojtek_wall(self):
+        return self._fitness("wojtek_wall")
+
+
+    # This function is the same as Wojtek's but punishes the loser instead of rewarding the winner when they hit a wall.
+    def get_fitness_wojtek_wall_updated(self):
+        return self._fitness("wojtek_wall_updated")
+
+
+    # Calculate fitness using winner and loser functions
+    def get_fitness_alex_winner_loser(self):
+        return self._fitness("alex_winner_loser")
+
+
+    # calculate fitness using both wall and winner loser functions
+    def get_fitness_alex_wojtek_combined(self):
+        return self._fitness("alex_wojtek_combined")
+
+
+    # this fitness function gives both players points for time alive, as well as 500 points for the winner
+    def get_fitness_basic(self):
+        return self._fitness("basic")
+
+
+    # this fitness function only rewards the winner 500 points, and give no points based on time spent alive
+    def get_fitness_no_time(self):
+        return self._fitness("no_time")
@@ -1,41 +1,170 @@
 # this file stores the functions for getting AI input at each game state
+import configparser
+import numpy as np
 
 # effectively how far in each direction the snake can see a wall
+# percepts are read from a RayIndex so any value up to the number of cells (full board sight) costs the same,
+# the saved winner genomes were trained with 3
 FORESIGHT = 3
 
-""" This function returns the distance between the given head and the closest wall (grid border or body) to the north
-    Inputs: x,y coordinate of a snakes head
+# rows sit half a cell above the pixel grid the coordinate percepts were first measured on,
+# keep that offset so saved genomes see the same inputs they were trained with
+ROW_OFFSET = 0.5
+
+# directions of the ray index in the same order as the percepts
+NORTH, SOUTH, EAST, WEST = range(4)
+
+# the percepts networks can be trained on and the number of inputs each one gives a network
+# basic is what dist_totals gives, territory adds the room behind each move and the Voronoi territory difference
+BASIC = "basic"
+TERRITORY = "territory"
+PERCEPT_SETS = {BASIC: 8, TERRITORY: 13}
+
+
 """
-def _dist_north(x, y, p_bodies, grid_size, snake_speed):
-    dist = FORESIGHT
-    for grid_y in range(y+snake_speed, grid_size, snake_speed):
-        if p_bodies[x, grid_y] or dist == 0: break
-        else: dist -= 1
-    return dist
+Incremental index of how far each cell can see, kept alongside a board.
+For every cell and direction it stores the number of free cells in a straight line
+before the first body or the edge of the grid.
+Filling a cell only changes the rays that pass through it, which are in the same row and column,
+so a percept is a lookup instead of a scan and any FORESIGHT costs the same.
+The runs are a flat list indexed by direction, x, y so copying and single cell access stay cheap.
+"""
+class RayIndex:
+
+    def __init__(self, p_bodies):
+        self.cells = p_bodies.shape[-1]
+        self.runs = _free_runs(p_bodies).ravel().tolist()
+
+
+    def copy(self):
+        index = RayIndex.__new__(RayIndex)
+        index.cells = self.cells
+        index.runs = self.runs.copy()
+        return index
+
+
+    # the runs as a (4, cells, cells) array
+    def as_array(self):
+        return np.array(self.runs, dtype=np.int16).reshape(4, self.cells, self.cells)
+
+
+    # update the rays blocked by a body placed at the free cell x, y
+    # only the free cells between it and the next body in each direction change, along with that next body
+    # if a log list is given, what was overwritten is added to it so undo() can put it back
+    def fill(self, x, y, log=None):
+        if log is not None: return self._fill_logged(x, y, log)
+        runs = self.runs
+        cells = self.cells
+        size = cells * cells
+        i = x * cells + y
+
+        # cells below now see it k free cells to the north, cells above see it k free cells to the south
+        below = min(runs[SOUTH * size + i] + 1, y)
+        above = min(runs[NORTH * size + i] + 1, cells - 1 - y)
+        runs[NORTH * size + i - below:NORTH * size + i] = range(below - 1, -1, -1)
+        runs[SOUTH * size + i + 1:SOUTH * size + i + 1 + above] = range(above)
+
+        # cells to the left now see it to the east, cells to the right see it to the west
+        left = min(runs[WEST * size + i] + 1, x)
+        right = min(runs[EAST * size + i] + 1, cells - 1 - x)
+        runs[EAST * size + i - left * cells:EAST * size + i:cells] = range(left - 1, -1, -1)
+        runs[WEST * size + i + cells:WEST * size + i + (right + 1) * cells:cells] = range(right)
 
 
-def _dist_south(x, y, p_bodies, snake_speed):
-    dist = FORESIGHT
-    for grid_y in range(y-snake_speed, -1, -snake_speed):
-        if p_bodies[x, grid_y] or dist == 0: break
-        else: dist -= 1
-    return dist
+    # fill() that logs the runs it overwrites, kept apart so filling without a log stays as cheap as it was
+    def _fill_logged(self, x, y, log):
+        runs = self.runs
+        cells = self.cells
+        size = cells * cells
+        i = x * cells + y
 
+        below = min(runs[SOUTH * size + i] + 1, y)
+        above = min(runs[NORTH * size + i] + 1, cells - 1 - y)
+        left = min(runs[WEST * size + i] + 1, x)
+        right = min(runs[EAST * size + i] + 1, cells - 1 - x)
+        north = slice(NORTH * size + i - below, NORTH * size + i)
+        south = slice(SOUTH * size + i + 1, SOUTH * size + i + 1 + above)
+        east = slice(EAST * size + i - left * cells, EAST * size + i, cells)
+        west = slice(WEST * size + i + cells, WEST * size + i + (right + 1) * cells, cells)
+        log.append((north, runs[north], south, runs[south], east, runs[east], west, runs[west]))
 
-def _dist_east(x, y, p_bodies, grid_size, snake_speed):
-    dist = FORESIGHT
-    for grid_x in range(x+snake_speed, grid_size, snake_speed):
-        if p_bodies[grid_x, y] or dist == 0: break
-        else: dist -= 1
-    return dist
+        runs[north] = range(below - 1, -1, -1)
+        runs[south] = range(above)
+        runs[east] = range(left - 1, -1, -1)
+        runs[west] = range(right)
 
 
-def _dist_west(x, y, p_bodies, snake_speed):
-    dist = FORESIGHT
-    for grid_x in range(x-snake_speed, -1, -snake_speed):
-        if p_bodies[grid_x, y] or dist == 0: break
-        else: dist -= 1
-    return dist
+    # take back the fills logged after the first length entries of a log from fill(), latest first
+    def undo(self, log, length):
+        runs = self.runs
+        while len(log) > length:
+            north, north_runs, south, south_runs, east, east_runs, west, west_runs = log.pop()
+            runs[north] = north_runs
+            runs[south] = south_runs
+            runs[east] = east_runs
+            runs[west] = west_runs
+
+
+    # this returns the distance between the given head and the closest wall (grid border or body) in each direction
+    def dists(self, x, y):
+        runs = self.runs
+        size = self.cells * self.cells
+        i = x * self.cells + y
+        return [FORESIGHT - min(runs[NORTH * size + i], FORESIGHT),
+                FORESIGHT - min(runs[SOUTH * size + i], FORESIGHT),
+                FORESIGHT - min(runs[EAST * size + i], FORESIGHT),
+                FORESIGHT - min(runs[WEST * size + i], FORESIGHT)]
+
+
+"""
+Percepts read straight from the bodies, for boards too large to keep a RayIndex of.
+A percept only needs FORESIGHT cells in each direction, so looking them up costs the same on any board.
+It has the same dists() as RayIndex, and fill() has nothing to update.
+"""
+class SparseRays:
+
+    def __init__(self, p_bodies):
+        self.cells = p_bodies.shape[-1]
+        self._p_bodies = p_bodies
+
+
+    def fill(self, x, y, log=None):
+        pass
+
+
+    def undo(self, log, length):
+        pass
+
+
+    def dists(self, x, y):
+        return [FORESIGHT - self._run(x, y, 0, 1),
+                FORESIGHT - self._run(x, y, 0, -1),
+                FORESIGHT - self._run(x, y, 1, 0),
+                FORESIGHT - self._run(x, y, -1, 0)]
+
+
+    # free cells in a straight line from x, y, up to FORESIGHT
+    def _run(self, x, y, dx, dy):
+        for k in range(1, FORESIGHT + 1):
+            cx, cy = x + k * dx, y + k * dy
+            if not (0 <= cx < self.cells and 0 <= cy < self.cells) or self._p_bodies[cx, cy]: return k - 1
+        return FORESIGHT
+
+
+# free cells in a straight line from every cell in each direction, built by walking back from the far edge
+def _free_runs(p_bodies):
+    cells = p_bodies.shape[-1]
+    free = ~p_bodies
+    runs = np.zeros((4,) + p_bodies.shape, dtype=np.int16)
+
+    for i in range(cells - 2, -1, -1):
+        runs[NORTH][..., i] = free[..., i + 1] * (runs[NORTH][..., i + 1] + 1)
+        runs[EAST][..., i, :] = free[..., i + 1, :] * (runs[EAST][..., i + 1, :] + 1)
+    for i in range(1, cells):
+        runs[SOUTH][..., i] = free[..., i - 1] * (runs[SOUTH][..., i - 1] + 1)
+        runs[WEST][..., i, :] = free[..., i - 1, :] * (runs[WEST][..., i - 1, :] + 1)
+
+    return runs
 
 
 """
@@ -45,36 +174,108 @@ red's list(first list returned) [self_north, self_south, self_east, self_west, b
 blue's list(second list returned) [self_north, self_south, self_east, self_west, red_min_dist]
 red gets blue's min dist to be used for "aggression" and vis versa for blue
 """
-def dist_totals(r_cord, b_cord, p_bodies, grid_size, snake_speed):
+def dist_totals(r_cord, b_cord, rays):
+    return percepts(r_cord, b_cord, rays), percepts(b_cord, r_cord, rays)
 
-    # get distances for all 4 directions of each snake
-    r_north = _dist_north(r_cord.x, r_cord.y, p_bodies, grid_size, snake_speed)
-    r_south = _dist_south(r_cord.x, r_cord.y, p_bodies, snake_speed)
-    r_east = _dist_east(r_cord.x, r_cord.y, p_bodies, grid_size, snake_speed)
-    r_west = _dist_west(r_cord.x, r_cord.y, p_bodies, snake_speed)
 
-    b_north = _dist_north(b_cord.x, b_cord.y, p_bodies, grid_size, snake_speed)
-    b_south = _dist_south(b_cord.x, b_cord.y, p_bodies, snake_speed)
-    b_east = _dist_east(b_cord.x, b_cord.y, p_bodies, grid_size, snake_speed)
-    b_west = _dist_west(b_cord.x, b_cord.y, p_bodies, snake_speed)
+# percepts of a single snake, the same list dist_totals gives it, without working out the opponent's
+def percepts(cord, other_cord, rays):
+    cells = rays.cells
 
+    # get distances for all 4 directions of the snake
+    north, south, east, west = rays.dists(cord.x, cord.y)
 
-    # for each snake, return their distances from 4 cardinal walls,
+    # return its distances from 4 cardinal walls,
     # coordinates for itself and opponent
-    # distances from each other, and a var stating if red or blue
-    return [r_north / FORESIGHT,
-            r_south / FORESIGHT,
-            r_east / FORESIGHT,
-            r_west / FORESIGHT,
-            r_cord.x / grid_size,
-            r_cord.y / grid_size,
-            b_cord.x / grid_size,
-            b_cord.y / grid_size],\
-           [b_north / FORESIGHT,
-            b_south / FORESIGHT,
-            b_east / FORESIGHT,
-            b_west / FORESIGHT,
-            b_cord.x / grid_size,
-            b_cord.y / grid_size,
-            r_cord.x / grid_size,
-            r_cord.y / grid_size]
+    return [north / FORESIGHT,
+            south / FORESIGHT,
+            east / FORESIGHT,
+            west / FORESIGHT,
+            cord.x / cells,
+            (cord.y + ROW_OFFSET) / cells,
+            other_cord.x / cells,
+            (other_cord.y + ROW_OFFSET) / cells]
+
+
+"""
+dist_totals with the territory percept set, territory is the game's territory.Territory
+each snake's basic percepts are followed by
+[north_reach, south_reach, east_reach, west_reach, territory_difference]
+reach is how many free cells a move into that direction leads to, 0 if that cell is a body,
+territory difference is how many more cells it gets to before its opponent than the opponent gets to first,
+all of them as a fraction of the free cells of an empty board
+"""
+def territory_totals(r_cord, b_cord, rays, territory):
+    # the territory split is the same for both snakes, seen from either side
+    red, blue = territory.territory(r_cord, b_cord)
+    return territory_percepts(r_cord, b_cord, rays, territory, red - blue),\
+           territory_percepts(b_cord, r_cord, rays, territory, blue - red)
+
+
+# territory percepts of a single snake, difference is its territory difference if it is already known
+def territory_percepts(cord, other_cord, rays, territory, difference=None):
+    area = territory.area
+    if difference is None:
+        mine, theirs = territory.territory(cord, other_cord)
+        difference = mine - theirs
+    return (percepts(cord, other_cord, rays)
+            + [reach / area for reach in territory.reach(cord.x, cord.y)]
+            + [difference / area])
+
+
+# name of the percept set chosen in a neat config file, BASIC if it does not choose one
+def from_config(filename):
+    parameters = configparser.ConfigParser()
+    parameters.read(filename)
+    name = parameters.get("TronPercepts", "percept_set", fallback=BASIC)
+    if name not in PERCEPT_SETS:
+        raise ValueError("Unknown percept set {0}, expected one of {1}".format(
+            name, ", ".join(sorted(PERCEPT_SETS))))
+    return name
+
+
+# make the genomes of a loaded neat config take as many inputs as a percept set gives,
+# whatever num_inputs the config file has
+def set_num_inputs(genome_config, percept_set):
+    genome_config.num_inputs = PERCEPT_SETS[percept_set]
+    genome_config.input_keys = [-i - 1 for i in range(genome_config.num_inputs)]
+
+
+"""
+batched version of dist_totals for many games at once
+r_cords and b_cords are (N, 2) integer arrays of head cells,
+games are the indexes of those N games into runs, a (4, games, cells, cells) array of stacked RayIndex runs
+returns two (N, 8) float arrays with the same values dist_totals gives for each game
+"""
+def dist_totals_batch(r_cords, b_cords, games, runs):
+    cells = runs.shape[-1]
+
+    # (4, N) arrays of north, south, east, west distances
+    r_dists = FORESIGHT - np.minimum(runs[:, games, r_cords[:, 0], r_cords[:, 1]], FORESIGHT)
+    b_dists = FORESIGHT - np.minimum(runs[:, games, b_cords[:, 0], b_cords[:, 1]], FORESIGHT)
+
+    return np.column_stack(list(r_dists / FORESIGHT) +
+                           [r_cords[:, 0] / cells, (r_cords[:, 1] + ROW_OFFSET) / cells,
+                            b_cords[:, 0] / cells, (b_cords[:, 1] + ROW_OFFSET) / cells]),\
+           np.column_stack(list(b_dists / FORESIGHT) +
+                           [b_cords[:, 0] / cells, (b_cords[:, 1] + ROW_OFFSET) / cells,
+                            r_cords[:, 0] / cells, (r_cords[:, 1] + ROW_OFFSET) / cells])
+
+
+# batched RayIndex.fill, places a body at (xs[i], ys[i]) on game games[i] of a stacked runs array
+def fill_batch(runs, games, xs, ys):
+    line = np.arange(runs.shape[-1])
+    x = xs[:, np.newaxis]
+    y = ys[:, np.newaxis]
+
+    # columns through the new bodies
+    north = runs[NORTH, games, xs, :]
+    runs[NORTH, games, xs, :] = np.where(line < y, np.minimum(north, y - 1 - line), north)
+    south = runs[SOUTH, games, xs, :]
+    runs[SOUTH, games, xs, :] = np.where(line > y, np.minimum(south, line - y - 1), south)
+
+    # rows through the new bodies
+    east = runs[EAST, games, :, ys]
+    runs[EAST, games, :, ys] = np.where(line < x, np.minimum(east, x - 1 - line), east)
+    west = runs[WEST, games, :, ys]
+    runs[WEST, games, :, ys] = np.where(line > x, np.minimum(west, line - x - 1), west)
@@ -0,0 +1,244 @@
+# this file stores the benchmark suite for the simulation, percept and training hot paths
+#
+# python benchmark.py [--out results.json] [--repeats 5]   measure everything and save the results
+# python benchmark.py compare old.json new.json            flag what got slower between two saved runs
+#
+# Every benchmark uses fixed seeds so two runs do the same work, and keeps the best of several repeats
+# since the best time is the one least disturbed by whatever else the machine was doing.
+#
+# eval_genomes is also timed with NeatManager.WORKERS set to each of --workers, on a population of SCALING_SIZE,
+# and the speedup over one worker is printed. With as many cpus as workers the speedup should be close to the number
+# of workers, the workers only get the settings and genomes once per generation and the games in chunks.
+# The cpus of the machine are saved with the results, there is no speedup to be had with more workers than cpus.
+import argparse
+import contextlib
+import io
+import json
+import os
+import pickle
+import platform
+import random
+import sys
+import time
+import numpy as np
+import neat
+from TronCore import TronCore
+from TronGame import TronGame
+from ai_inputs import dist_totals
+
+SEED = 472
+LOCAL_DIR = os.path.dirname(os.path.abspath(__file__))
+WINNERS = ["winner1", "winner10", "winner20", "winner30", "winner40", "winner50", "winnerALL"]
+# population sizes eval_genomes is timed at
+POPULATION_SIZES = [10, 20, 40]
+# numbers of worker processes eval_genomes is timed with, and the population size they are timed on
+WORKER_COUNTS = [1, 2, 4]
+SCALING_SIZE = 80
+# a result is flagged when it is this much worse than before
+THRESHOLD = 0.05
+
+
+def load_config(pop_size=None):
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                os.path.join(LOCAL_DIR, "config-feedforward.txt"))
+    if pop_size is not None: config.pop_size = pop_size
+    return config
+
+
+def load_winner_nets(config):
+    nets = []
+    for name in WINNERS:
+        with open(os.path.join(LOCAL_DIR, name + ".pkl"), "rb") as f:
+            nets.append(neat.nn.FeedForwardNetwork.create(pickle.load(f), config))
+    return nets
+
+
+# the shortest time of running a benchmark repeats times, it returns how much work it did
+def best_time(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        work = function()
+        times.append(time.perf_counter() - start)
+    return work, min(times)
+
+
+# headless TronGame ticks per second, every saved winner plays every other with both colors
+def bench_ticks(config, repeats):
+    nets = load_winner_nets(config)
+
+    def play():
+        ticks = 0
+        for red in nets:
+            for blue in nets:
+                if red is blue: continue
+                game = TronGame(graphics_enable=False, ai_red_net=red, ai_blue_net=blue, delay=0)
+                game.start_game()
+                ticks += game.get_outcome().time
+        return ticks
+
+    ticks, seconds = best_time(play, repeats)
+    return ticks / seconds, "ticks/s"
+
+
+# boards part way through games where both snakes wander randomly without running into anything they can avoid
+def mid_game_boards(count, rng):
+    boards = []
+    while len(boards) < count:
+        game = TronCore()
+        for _ in range(rng.randint(20, 120)):
+            actions = []
+            for loc, aim in [(game._red_loc, game._red_aim), (game._blue_loc, game._blue_aim)]:
+                safe = [action for action, (x, y) in enumerate(TronCore.DIRECTIONS)
+                        if (x, y) != (-aim.x, -aim.y) and not game._p_bodies[loc.x + x, loc.y + y]]
+                actions.append(rng.choice(safe) if safe else None)
+            if game.step(*actions) != TronCore.GameState.ongoing: break
+        else:
+            boards.append((game._red_loc, game._blue_loc, game._rays))
+    return boards
+
+
+# dist_totals calls per second on mid-game boards
+def bench_dist_totals(config, repeats):
+    boards = mid_game_boards(200, random.Random(SEED))
+
+    def percepts():
+        for _ in range(50):
+            for red_loc, blue_loc, rays in boards:
+                dist_totals(red_loc, blue_loc, rays)
+        return 50 * len(boards)
+
+    calls, seconds = best_time(percepts, repeats)
+    return calls / seconds, "calls/s"
+
+
+# FeedForwardNetwork.activate calls per second for the saved winners
+def bench_activate(config, repeats):
+    nets = load_winner_nets(config)
+    rng = np.random.default_rng(SEED)
+    inputs = rng.random((2000, config.genome_config.num_inputs)).tolist()
+
+    def activate():
+        for net in nets:
+            for x in inputs:
+                net.activate(x)
+        return len(nets) * len(inputs)
+
+    calls, seconds = best_time(activate, repeats)
+    return calls / seconds, "activations/s"
+
+
+# seconds eval_genomes takes per generation for a new population of pop_size, playing games on workers processes
+def bench_eval_genomes(pop_size, repeats, generations=2, workers=1):
+    import NeatManager
+    from outcome_cache import OutcomeCache
+
+    NeatManager.WORKERS = workers
+
+    def train():
+        random.seed(SEED)
+        pop = neat.population.Population(load_config(pop_size))
+        NeatManager.eval_genomes.gen = 0
+        # every run starts with an empty cache, like a fresh training run
+        if NeatManager.OUTCOME_CACHE is not None:
+            NeatManager.OUTCOME_CACHE = OutcomeCache(NeatManager.OUTCOME_CACHE.max_size)
+        with contextlib.redirect_stdout(io.StringIO()):
+            pop.run(NeatManager.eval_genomes, generations)
+        return generations
+
+    # the worker processes are started before timing, as they are once per training run
+    if workers > 1: NeatManager.get_worker_pool()
+    try:
+        generations, seconds = best_time(train, repeats)
+    finally:
+        NeatManager.close_worker_pool()
+        NeatManager.WORKERS = 1
+    return seconds / generations, "s/generation"
+
+
+# run every benchmark, returns the results to save
+def run_all(repeats, population_sizes, worker_counts=WORKER_COUNTS):
+    config = load_config()
+    benchmarks = [("ticks", lambda: bench_ticks(config, repeats)),
+                  ("dist_totals", lambda: bench_dist_totals(config, repeats)),
+                  ("activate", lambda: bench_activate(config, repeats))]
+    for pop_size in population_sizes:
+        benchmarks.append(("eval_genomes_pop{0}".format(pop_size),
+                           lambda pop_size=pop_size: bench_eval_genomes(pop_size, repeats)))
+    for workers in worker_counts:
+        benchmarks.append(("eval_genomes_workers{0}".format(workers),
+                           lambda workers=workers: bench_eval_genomes(SCALING_SIZE, repeats, workers=workers)))
+
+    results = {}
+    for name, benchmark in benchmarks:
+        value, unit = benchmark()
+        results[name] = {"value": value, "unit": unit, "higher_is_better": unit.endswith("/s")}
+        print("{0:<22} {1:>14.4g} {2}".format(name, value, unit))
+
+    # speedup of every number of workers over the first one
+    scaling = [(workers, results["eval_genomes_workers{0}".format(workers)]["value"]) for workers in worker_counts]
+    for workers, seconds in scaling[1:]:
+        speedup = scaling[0][1] / seconds
+        print("{0} workers: {1:.2f}x the speed of {2}, {3:.0%} of linear on {4} cpus".format(
+            workers, speedup, scaling[0][0], speedup * scaling[0][0] / workers, os.cpu_count()))
+
+    return {"machine": {"python": platform.python_version(), "numpy": np.__version__,
+                        "platform": platform.platform(), "processor": platform.processor(),
+                        "cpus": os.cpu_count()},
+            "seed": SEED, "repeats": repeats, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results}
+
+
+"""
+Print how every result changed between two saved runs.
+A result is a regression when it got worse by more than threshold, as a fraction of the old value.
+Returns the names of the regressions.
+"""
+def compare(old, new, threshold=THRESHOLD):
+    regressions = []
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            print("{0:<22} {1:>14.4g} {2} (new)".format(name, result["value"], result["unit"]))
+            continue
+
+        before = old["results"][name]["value"]
+        change = (result["value"] - before) / before
+        worse = -change if result["higher_is_better"] else change
+        flag = ""
+        if worse > threshold:
+            flag = "REGRESSION"
+            regressions.append(name)
+        print("{0:<22} {1:>14.4g} -> {2:>14.4g} {3:<14} {4:+7.1%} {5}".format(
+            name, before, result["value"], result["unit"], change, flag))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the simulation, percepts, networks and training")
+    subparsers = parser.add_subparsers(dest="command")
+    parser.add_argument("--out", default="benchmark.json", help="file to save the results to")
+    parser.add_argument("--repeats", type=int, default=5, help="times each benchmark is run, the best is kept")
+    parser.add_argument("--populations", type=int, nargs="*", default=POPULATION_SIZES,
+                        help="population sizes to time eval_genomes at")
+    parser.add_argument("--workers", type=int, nargs="*", default=WORKER_COUNTS,
+                        help="numbers of worker processes to time eval_genomes with")
+    compare_parser = subparsers.add_parser("compare", help="compare two saved runs")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                                help="fraction a result can get worse by before it is flagged")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        # a non zero exit status lets scripts stop on regressions
+        sys.exit(1 if compare(old, new, args.threshold) else 0)
+
+    results = run_all(args.repeats, args.populations, args.workers)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print("saved to", args.out)
@@ -0,0 +1,110 @@
+# this file stores the board games are played on: its size, where the snakes start and how bodies are stored
+#
+# Small boards keep bodies in a (cells, cells) numpy array with a RayIndex next to it, copied for each game.
+# Large boards keep only the cells the snakes have filled in a set and work out the walls from the coordinates,
+# so memory and the cost of a tick grow with the length of the trails instead of the area of the board.
+import numpy as np
+from ai_inputs import RayIndex, SparseRays
+from territory import Territory
+
+# boards with more cells per side than this store their bodies sparsely unless told otherwise
+SPARSE_CELLS = 200
+
+
+# a (cells, cells) grid with a wall of bodies around the edges of the board
+# the top row doubles as the bottom wall, moving below row 0 indexes row -1 which numpy wraps around to it
+def walls(cells):
+    p_bodies = np.zeros((cells, cells), dtype=bool)
+    p_bodies[0, :] = True
+    p_bodies[-1, :] = True
+    p_bodies[:, -1] = True
+    return p_bodies
+
+
+"""
+Bodies of a board stored as the set of cells the snakes have filled.
+It is indexed like the numpy grid from walls(), p_bodies[x, y] is True for walls and filled cells.
+"""
+class SparseBodies:
+
+    def __init__(self, cells):
+        self.cells = cells
+        self.shape = (cells, cells)
+        self._filled = set()
+
+
+    def __len__(self):
+        return self.cells
+
+
+    def __getitem__(self, cell):
+        x, y = cell
+        # the same wall as walls(), including a move below row 0 ending up on the top row
+        if y < 0: y += self.cells
+        return x <= 0 or x >= self.cells - 1 or y >= self.cells - 1 or (x, y) in self._filled
+
+
+    def __setitem__(self, cell, filled):
+        if filled: self._filled.add(cell)
+        else: self._filled.discard(cell)
+
+
+    def copy(self):
+        bodies = SparseBodies(self.cells)
+        bodies._filled = self._filled.copy()
+        return bodies
+
+
+"""
+Size, start positions and body storage of the board games are played on.
+Starts are (x, y) cells and directions, by default the snakes start a fifth of the way in from the
+left and right walls, halfway up, facing each other. sparse picks the body storage, by default
+boards larger than SPARSE_CELLS are sparse.
+"""
+class Board:
+
+    def __init__(self, cells=25, red_start=None, blue_start=None, red_dir=(1, 0), blue_dir=(-1, 0), sparse=None):
+        self.cells = cells
+        self.red_start = tuple(red_start) if red_start is not None else (cells // 5, cells // 2)
+        self.blue_start = tuple(blue_start) if blue_start is not None else (cells - cells // 5 - 1, cells // 2)
+        self.red_dir = tuple(red_dir)
+        self.blue_dir = tuple(blue_dir)
+        self.sparse = cells > SPARSE_CELLS if sparse is None else sparse
+
+        for x, y in [self.red_start, self.blue_start]:
+            if not (0 < x < cells - 1 and 0 <= y < cells - 1):
+                raise ValueError("Start cell {0} is not inside a board of {1} cells".format((x, y), cells))
+
+        # a dense board's empty grid and ray index are built once and copied for every game
+        self._walls = None if self.sparse else walls(cells)
+        self._rays = None if self.sparse else RayIndex(self._walls)
+        # only built once a game needs the territory percepts
+        self._territory = None
+
+
+    # starting conditions in the form TronCore.reset() takes
+    @property
+    def start(self):
+        return self.red_start, self.red_dir, self.blue_start, self.blue_dir
+
+
+    # bodies of a new game, only the walls are filled
+    def new_bodies(self):
+        if self.sparse: return SparseBodies(self.cells)
+        return self._walls.copy()
+
+
+    # percept index of a new game with the given bodies from new_bodies()
+    def new_rays(self, p_bodies):
+        if self.sparse: return SparseRays(p_bodies)
+        return self._rays.copy()
+
+
+    # territory index of a new game with the given bodies from new_bodies(), dense boards only
+    def new_territory(self, p_bodies):
+        if self._territory is None: self._territory = Territory(self._walls)
+        return self._territory.copy(p_bodies)
+
+
+# the board every game is played on unless another one is given
+DEFAULT_BOARD = Board()
@@ -0,0 +1,165 @@
+# this file stores the checkpoints training saves as it goes, and resumes from after a crash
+#
+# A checkpoint is everything needed to go on from the end of a generation exactly as if training had never stopped:
+# the population, species, ids to give the next genomes and species, the best genome so far and the state of random,
+# plus whatever extra state the caller adds, like NeatManager's matchmaker.
+# At the end of a generation the state is pickled into memory, which takes milliseconds.
+# Compressing and writing it happens on a background thread, so the next generation starts right away.
+# Files are written under a temporary name and renamed into place, so a checkpoint is either whole or missing,
+# and only the newest few are kept.
+import glob
+import gzip
+import itertools
+import os
+import pickle
+import random
+import threading
+import neat
+
+# name of the checkpoint taken before generation number, generations count from 0 like neat's
+FILE_NAME = "checkpoint-{0:06d}.pkl.gz"
+
+
+"""
+A neat reporter that checkpoints the Population pop to directory every few generations.
+Only the newest keep checkpoints are kept, level is the gzip compression level.
+extra is a function returning a dict of more state to save, it is called at the same time as the population is saved.
+If the newest checkpoint is still being written when the next one is taken, the newest one is written instead,
+skipped counts the checkpoints this dropped. Call close() to wait for the last one to be written.
+"""
+class CheckpointReporter(neat.reporting.BaseReporter):
+
+    def __init__(self, pop, directory, every=1, keep=3, level=6, extra=None):
+        self.pop = pop
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.level = level
+        self.extra = extra
+        self.skipped = 0
+        self.written = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # (generation, pickled state) waiting to be written, and the error that stopped the writer if any
+        self._pending = None
+        self._error = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._write_loop, name="checkpoint writer", daemon=True)
+        self._thread.start()
+
+
+    def end_generation(self, config, population, species_set):
+        # the population is already the next generation's, that is the one a resumed run evaluates first
+        generation = self.pop.generation + 1
+        if generation % self.every: return
+        data = snapshot(self.pop, generation, {} if self.extra is None else self.extra())
+
+        with self._condition:
+            self._raise_error()
+            if self._pending is not None: self.skipped += 1
+            self._pending = (generation, data)
+            self._condition.notify()
+
+
+    # wait for the checkpoint being written, then stop the writer
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self._raise_error()
+
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Writing a checkpoint to {0} failed".format(self.directory)) from error
+
+
+    def _write_loop(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed: self._condition.wait()
+                if self._pending is None: return
+                generation, data = self._pending
+                self._pending = None
+
+            try:
+                self._write(generation, data)
+            except Exception as error:
+                with self._condition: self._error = error
+
+
+    def _write(self, generation, data):
+        path = os.path.join(self.directory, FILE_NAME.format(generation))
+        temporary = path + ".tmp"
+        # mtime=0 so the same state always compresses to the same bytes
+        compressed = gzip.compress(data, compresslevel=self.level, mtime=0)
+        with open(temporary, "wb") as f:
+            f.write(compressed)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        self.written += 1
+
+        for old in checkpoints(self.directory)[:-self.keep]:
+            os.remove(old)
+
+
+"""
+The state of a Population at the end of a generation pickled into bytes, generation is the one it evaluates next.
+neat counts genome and species ids with itertools.count,
+which is read by taking the next id and starting a new count there.
+"""
+def snapshot(pop, generation, extra):
+    next_genome_id = next(pop.reproduction.genome_indexer)
+    pop.reproduction.genome_indexer = itertools.count(next_genome_id)
+    next_species_id = next(pop.species.indexer)
+    pop.species.indexer = itertools.count(next_species_id)
+
+    # species sets and reproduction hold the reporters, which are not saved, so only their data is
+    state = {"generation": generation, "config": pop.config, "population": pop.population,
+             "species": pop.species.species, "genome_to_species": pop.species.genome_to_species,
+             "next_species_id": next_species_id, "next_genome_id": next_genome_id,
+             "ancestors": pop.reproduction.ancestors, "best_genome": pop.best_genome,
+             "random_state": random.getstate(), "extra": extra}
+    return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+# paths of the checkpoints in directory, oldest first
+def checkpoints(directory):
+    return sorted(glob.glob(os.path.join(directory, FILE_NAME.replace("{0:06d}", "[0-9]" * 6))))
+
+
+# path of the newest checkpoint in directory, None if it has none
+def latest(directory):
+    paths = checkpoints(directory)
+    return paths[-1] if paths else None
+
+
+"""
+The Population saved in a checkpoint file, or in the newest checkpoint of a directory,
+and the extra state saved with it.
+random is set back to the state it was in, so training goes on exactly as it would have.
+Reporters are not saved, add them again to the population.
+"""
+def restore(path):
+    if os.path.isdir(path):
+        directory, path = path, latest(path)
+        if path is None: raise FileNotFoundError("No checkpoints in {0}".format(directory))
+    with gzip.open(path, "rb") as f:
+        state = pickle.load(f)
+
+    config = state["config"]
+    pop = neat.population.Population(config, (state["population"], None, state["generation"]))
+    pop.species = config.species_set_type(config.species_set_config, pop.reporters)
+    pop.species.species = state["species"]
+    pop.species.genome_to_species = state["genome_to_species"]
+    pop.species.indexer = itertools.count(state["next_species_id"])
+    pop.reproduction.genome_indexer = itertools.count(state["next_genome_id"])
+    pop.reproduction.ancestors = state["ancestors"]
+    pop.best_genome = state["best_genome"]
+
+    random.setstate(state["random_state"])
+    return pop, state["extra"]
@@ -0,0 +1,186 @@
+# this file stores the compiler that turns neat feed forward networks into layered numpy weight matrices,
+# so the moves of many games can be chosen with one batched call instead of one activate() per snake
+import numpy as np
+import neat
+
+
+# activation functions that can be compiled, with their numpy equivalent
+# these match neat.activations, including the scaling and clamping neat applies
+def _tanh(z):
+    return np.tanh(np.clip(2.5 * z, -60.0, 60.0))
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0)))
+
+
+def _identity(z):
+    return z
+
+
+ACTIVATIONS = [(neat.activations.tanh_activation, _tanh),
+               (neat.activations.sigmoid_activation, _sigmoid),
+               (neat.activations.identity_activation, _identity)]
+
+
+"""
+A group of feed forward networks compiled into stacked layer matrices.
+Every network's node values live in a row of columns: its inputs first, then its nodes in evaluation order.
+Layer l of network p is a square weight matrix over those columns, plus the bias, response,
+activation and a mask of which columns that layer computes.
+Networks with fewer nodes or layers are padded with columns and layers that compute nothing.
+activate() evaluates any mix of the networks on a batch of inputs at once,
+and gives the same outputs as FeedForwardNetwork.activate() within float rounding.
+"""
+class CompiledNetworks:
+
+    def __init__(self, nets):
+        nets = list(nets)
+        if not nets:
+            raise ValueError("Expected at least one network to compile")
+
+        self.num_inputs = len(nets[0].input_nodes)
+        self.num_outputs = len(nets[0].output_nodes)
+        for net in nets:
+            if len(net.input_nodes) != self.num_inputs or len(net.output_nodes) != self.num_outputs:
+                raise ValueError("All compiled networks need the same number of inputs and outputs")
+
+        compiled = [_compile_layers(net) for net in nets]
+        self.num_layers = max(1, max(len(layers) for _, layers in compiled))
+        self.num_columns = max(self.num_inputs, max(len(columns) for columns, _ in compiled))
+
+        shape = (len(nets), self.num_layers, self.num_columns)
+        self._weights = np.zeros(shape + (self.num_columns,))
+        self._bias = np.zeros(shape)
+        self._response = np.zeros(shape)
+        self._computes = np.zeros(shape, dtype=bool)
+        # index into ACTIVATIONS of every column
+        self._activation = np.zeros(shape, dtype=int)
+        self._outputs = np.zeros((len(nets), self.num_outputs), dtype=int)
+
+        for p, (net, (columns, layers)) in enumerate(zip(nets, compiled)):
+            for l, layer in enumerate(layers):
+                for node, activation, bias, response, links in layer:
+                    column = columns[node]
+                    self._computes[p, l, column] = True
+                    self._activation[p, l, column] = activation
+                    self._bias[p, l, column] = bias
+                    self._response[p, l, column] = response
+                    for i, w in links:
+                        self._weights[p, l, columns[i], column] += w
+
+            for o, node in enumerate(net.output_nodes):
+                self._outputs[p, o] = columns.get(node, -1)
+
+        # outputs that are never computed read a spare column that stays 0, like the 0.0 neat starts them at
+        if (self._outputs < 0).any():
+            self._add_zero_column()
+
+
+    def __len__(self):
+        return len(self._weights)
+
+
+    """
+    net_indexes is an (N,) array of which network to use for each of the (N, num_inputs) inputs
+    returns an (N, num_outputs) array of outputs
+    """
+    def activate(self, net_indexes, inputs):
+        net_indexes = np.asarray(net_indexes)
+        inputs = np.asarray(inputs, dtype=float)
+        if inputs.shape[1:] != (self.num_inputs,):
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(self.num_inputs, inputs.shape[-1]))
+
+        values = np.zeros((len(inputs), self.num_columns))
+        values[:, :self.num_inputs] = inputs
+
+        for l in range(self.num_layers):
+            computes = self._computes[net_indexes, l]
+            if not computes.any(): continue
+
+            s = np.einsum('bi,bij->bj', values, self._weights[net_indexes, l])
+            z = self._bias[net_indexes, l] + self._response[net_indexes, l] * s
+
+            activation = self._activation[net_indexes, l]
+            layer_values = np.zeros_like(z)
+            for a, (_, function) in enumerate(ACTIVATIONS):
+                uses = computes & (activation == a)
+                if uses.any():
+                    layer_values[uses] = function(z[uses])
+
+            values = np.where(computes, layer_values, values)
+
+        return np.take_along_axis(values, self._outputs[net_indexes], axis=1)
+
+
+    def _add_zero_column(self):
+        columns = self.num_columns
+        self._weights = np.pad(self._weights, ((0, 0), (0, 0), (0, 1), (0, 1)))
+        self._bias = np.pad(self._bias, ((0, 0), (0, 0), (0, 1)))
+        self._response = np.pad(self._response, ((0, 0), (0, 0), (0, 1)))
+        self._computes = np.pad(self._computes, ((0, 0), (0, 0), (0, 1)))
+        self._activation = np.pad(self._activation, ((0, 0), (0, 0), (0, 1)))
+        self.num_columns = columns + 1
+        self._outputs[self._outputs < 0] = columns
+
+
+"""
+Split a FeedForwardNetwork's node evaluations into layers that only depend on earlier layers.
+Returns the column of every input and node, and a list of layers of
+(node, activation index, bias, response, links) for each node computed in that layer.
+"""
+def _compile_layers(net):
+    columns = dict((node, i) for i, node in enumerate(net.input_nodes))
+    depth = dict((node, 0) for node in net.input_nodes)
+    layers = []
+
+    for node, act_func, agg_func, bias, response, links in net.node_evals:
+        if agg_func is not neat.aggregations.sum_aggregation:
+            raise ValueError("Only sum aggregation can be compiled, node {0} uses {1}".format(node, agg_func))
+        activation = [a for a, (function, _) in enumerate(ACTIVATIONS) if function is act_func]
+        if not activation:
+            raise ValueError("Only tanh, sigmoid and identity activations can be compiled, node {0} uses {1}"
+                             .format(node, act_func))
+
+        depth[node] = 1 + max([depth[i] for i, _ in links], default=0)
+        columns[node] = len(columns)
+        while len(layers) < depth[node]:
+            layers.append([])
+        layers[depth[node] - 1].append((node, activation[0], bias, response, links))
+
+    return columns, layers
+
+
+# compare the throughput of compiled batched activation against calling activate() once per input
+if __name__ == "__main__":
+    import os
+    import pickle
+    import time
+
+    local_dir = os.path.dirname(__file__)
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                os.path.join(local_dir, "config-feedforward.txt"))
+
+    nets = []
+    for name in ["winner1", "winner10", "winner20", "winner30", "winner40", "winner50", "winnerALL"]:
+        with open(os.path.join(local_dir, name + ".pkl"), "rb") as f:
+            nets.append(neat.nn.FeedForwardNetwork.create(pickle.load(f), config))
+
+    rng = np.random.default_rng(0)
+    batch_size = 10000
+    inputs = rng.random((batch_size, config.genome_config.num_inputs))
+    net_indexes = rng.integers(len(nets), size=batch_size)
+
+    start = time.perf_counter()
+    expected = [nets[p].activate(x) for p, x in zip(net_indexes.tolist(), inputs.tolist())]
+    per_call_time = time.perf_counter() - start
+
+    compiled = CompiledNetworks(nets)
+    start = time.perf_counter()
+    outputs = compiled.activate(net_indexes, inputs)
+    batched_time = time.perf_counter() - start
+
+    print("activate() per call: {0:.0f} activations/sec".format(batch_size / per_call_time))
+    print("compiled batch:      {0:.0f} activations/sec".format(batch_size / batched_time))
+    print("max difference:      {0:.3g}".format(np.abs(outputs - np.array(expected)).max()))
@@ -0,0 +1,457 @@
+# this file stores the coordinator and workers for playing a generation's matchups across several machines
+#
+# The coordinator runs inside NeatManager and listens on a TCP port, workers on any machine connect to it:
+#   TRON_AUTHKEY=secret python distributed_eval.py HOST PORT
+# Each generation the coordinator sends every worker the genomes and config once, then hands out chunks of
+# games to whichever workers have room for more. Once no chunks are left, idle workers are given copies of
+# chunks still being played elsewhere, so a slow worker never holds up the generation (work stealing).
+# A worker that disconnects has its chunks handed out again. Results are put back together in the order
+# of the games, so fitness is identical to a serial run however the chunks were spread.
+#
+# Messages are pickled, and unpickling runs code, so nothing is unpickled before both ends prove they hold the same
+# secret key: the coordinator and the worker each send a random challenge and check the HMAC of it the other sends back.
+# The key is the TRON_AUTHKEY environment variable unless one is passed in. The coordinator only listens on
+# localhost by default, listen on another address to let other machines connect.
+# Sends never block, messages wait in a queue for each worker until its socket takes them,
+# so a worker that reads slowly never holds up the others.
+import collections
+import hashlib
+import hmac
+import os
+import pickle
+import selectors
+import socket
+import struct
+import time
+import parallel_eval
+from ai_inputs import BASIC
+
+# port the coordinator listens on unless told otherwise
+PORT = 47200
+# environment variable holding the secret key of the coordinator and its workers
+AUTHKEY_ENV = "TRON_AUTHKEY"
+# bytes of every challenge
+CHALLENGE_SIZE = 32
+# seconds a connection has to answer its challenge
+HANDSHAKE_TIMEOUT = 10
+
+# kinds of messages
+SETUP = "setup"
+CHUNK = "chunk"
+RESULT = "result"
+STOP = "stop"
+
+# length of every message at the front of it
+_LENGTH = struct.Struct("!Q")
+# length of a worker's answer to its challenge, its HMAC of the challenge and a challenge of its own
+_ANSWER_SIZE = hashlib.sha256().digest_size + CHALLENGE_SIZE
+
+
+# the secret key as bytes, from AUTHKEY_ENV if authkey is None
+def get_authkey(authkey=None):
+    if authkey is None: authkey = os.environ.get(AUTHKEY_ENV, "")
+    if isinstance(authkey, str): authkey = authkey.encode()
+    if not authkey:
+        raise ValueError("Distributed evaluation needs a secret key, set {0} to the same value for the coordinator "
+                         "and every worker".format(AUTHKEY_ENV))
+    return authkey
+
+
+# proof of holding authkey for a challenge, role keeps a coordinator's proof from being sent back as a worker's
+def _proof(authkey, role, challenge):
+    return hmac.new(authkey, role + challenge, hashlib.sha256).digest()
+
+
+def send_message(sock, message):
+    _send_frame(sock, pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _send_frame(sock, data):
+    sock.sendall(_LENGTH.pack(len(data)) + data)
+
+
+# the next message from a blocking socket, None once it is closed
+def recv_message(sock):
+    data = _recv_frame(sock)
+    if data is None: return None
+    return pickle.loads(data)
+
+
+# the bytes of the next message from a blocking socket, None once it is closed
+def _recv_frame(sock, max_size=None):
+    header = _recv_exactly(sock, _LENGTH.size)
+    if header is None: return None
+    size = _LENGTH.unpack(header)[0]
+    if max_size is not None and size > max_size: raise ConnectionError("Message of {0} bytes is too long".format(size))
+    return _recv_exactly(sock, size)
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        part = sock.recv(min(size - len(data), 1 << 20))
+        if not part: return None
+        data += part
+    return bytes(data)
+
+
+# a connected worker as the coordinator sees it
+class _Worker:
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.connected = time.monotonic()
+        # the challenge it was sent, None once it answered it
+        self.challenge = os.urandom(CHALLENGE_SIZE)
+        # bytes received that do not make up a whole message yet
+        self.buffer = bytearray()
+        # bytes waiting to be sent, and the selector events it is registered for
+        self.outgoing = collections.deque()
+        self.events = selectors.EVENT_READ
+        # indexes of the chunks it is playing
+        self.chunks = []
+
+
+    @property
+    def authenticated(self):
+        return self.challenge is None
+
+
+    # the bytes of the whole messages received so far
+    # until it is authenticated only a message as long as the answer to its challenge is accepted
+    def frames(self):
+        frames = []
+        while len(self.buffer) >= _LENGTH.size:
+            size = _LENGTH.unpack_from(self.buffer)[0]
+            if not self.authenticated and size != _ANSWER_SIZE:
+                raise ConnectionError("{0} sent a message of {1} bytes before authenticating".format(
+                    self.address, size))
+            if len(self.buffer) < _LENGTH.size + size: break
+            frames.append(bytes(self.buffer[_LENGTH.size:_LENGTH.size + size]))
+            del self.buffer[:_LENGTH.size + size]
+        return frames
+
+
+"""
+Plays matchups on the workers connected to it, see play_matchups().
+Only workers that prove they hold authkey, by default from AUTHKEY_ENV, are sent anything or have anything unpickled.
+chunk_size is the number of games sent at a time, each worker is given up to prefetch chunks at once.
+A chunk is handed out again at most max_retries times after the workers playing it disconnected.
+play_matchups() waits up to wait seconds for a worker to connect whenever none are.
+"""
+class Coordinator:
+
+    def __init__(self, host="127.0.0.1", port=PORT, chunk_size=8, prefetch=2, max_retries=3, wait=60, authkey=None):
+        self.authkey = get_authkey(authkey)
+        self.chunk_size = chunk_size
+        self.prefetch = prefetch
+        self.max_retries = max_retries
+        self.wait = wait
+        self._listener = socket.create_server((host, port))
+        self._listener.setblocking(False)
+        self.address = self._listener.getsockname()
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ)
+        self._workers = {}
+        self._generation = 0
+        # how the last play_matchups() went: chunks played more than once because of stealing or retries
+        self.stolen = 0
+        self.retried = 0
+        # connections dropped for failing to authenticate
+        self.rejected = 0
+
+
+    def worker_count(self):
+        return len(self._authenticated())
+
+
+    def _authenticated(self):
+        return [worker for worker in self._workers.values() if worker.authenticated]
+
+
+    """
+    Play a list of (red_id, red_genome, blue_id, blue_genome) games on the connected workers.
+    Takes the same arguments as parallel_eval.play_matchups() apart from the number of workers,
+    and returns the same results in the same order.
+    """
+    def play_matchups(self, games, config, network_cache=None, endgame=None, record=False, board=None,
+                      percept_set=BASIC):
+        genomes = {}
+        for red_id, red_genome, blue_id, blue_genome in games:
+            genomes[red_id] = red_genome
+            genomes[blue_id] = blue_genome
+
+        ids = [(red_id, blue_id) for red_id, _, blue_id, _ in games]
+        chunks = [ids[i:i + self.chunk_size] for i in range(0, len(ids), self.chunk_size)]
+
+        # chunks are numbered within a generation, results of an earlier generation are ignored
+        # the setup is pickled once and the same bytes are queued for every worker
+        self._generation += 1
+        self._setup = _frame((SETUP, self._generation, genomes, config, endgame, record, board, percept_set))
+        for worker in self._authenticated():
+            del worker.chunks[:]
+            self._send(worker, self._setup)
+
+        self._pending = collections.deque(range(len(chunks)))
+        self._played = [None] * len(chunks)
+        self._retries = [0] * len(chunks)
+        self.stolen = 0
+        self.retried = 0
+        remaining = len(chunks)
+        alone_since = None
+
+        while remaining:
+            self._hand_out(chunks)
+
+            if not self.worker_count():
+                if alone_since is None: alone_since = time.monotonic()
+                elif time.monotonic() - alone_since > self.wait:
+                    raise RuntimeError("No workers connected to {0}:{1} for {2}s".format(*self.address, self.wait))
+            else:
+                alone_since = None
+
+            for key, events in self._selector.select(timeout=1):
+                if key.fileobj is self._listener:
+                    self._accept()
+                    continue
+
+                worker = self._workers.get(key.fileobj)
+                if worker is not None and events & selectors.EVENT_WRITE: self._flush(worker)
+                worker = self._workers.get(key.fileobj)
+                if worker is None or not events & selectors.EVENT_READ: continue
+                try:
+                    data = worker.sock.recv(1 << 20)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    data = b""
+                if not data:
+                    self._drop(worker)
+                    continue
+
+                worker.buffer += data
+                try:
+                    frames = worker.frames()
+                except ConnectionError:
+                    self.rejected += 1
+                    self._drop(worker)
+                    continue
+                for frame in frames:
+                    if not worker.authenticated:
+                        if not self._authenticate(worker, frame): break
+                        continue
+                    kind, generation, index, results, moves, stats = pickle.loads(frame)
+                    if generation != self._generation: continue
+                    if index in worker.chunks: worker.chunks.remove(index)
+                    # a stolen chunk can come back twice, games are deterministic so either copy will do
+                    if self._played[index] is None:
+                        self._played[index] = (results, moves, stats)
+                        remaining -= 1
+
+            # after reading, so answers that arrived between generations are not counted as late
+            self._drop_slow_handshakes()
+
+        results = []
+        moves = []
+        for chunk_results, chunk_moves, stats_change in self._played:
+            if network_cache is not None: network_cache.add_stats(*stats_change)
+            results += chunk_results
+            moves += chunk_moves
+
+        if record: return results, moves
+        return results
+
+
+    # tell the workers to stop and stop listening, what is still queued for them is sent first
+    def close(self):
+        stop = _frame((STOP,))
+        for worker in list(self._workers.values()):
+            if worker.authenticated:
+                try:
+                    worker.sock.settimeout(5)
+                    for data in worker.outgoing: worker.sock.sendall(data)
+                    for data in stop: worker.sock.sendall(data)
+                except OSError:
+                    pass
+            self._drop(worker)
+        self._selector.unregister(self._listener)
+        self._listener.close()
+        self._selector.close()
+
+
+    # give every worker with room for another chunk the next one that is not played yet,
+    # once none are left a worker with nothing to do is given a copy of one being played by another worker
+    # a copy cannot be called off, so a worker only takes one while it is idle to not hold up the next generation
+    def _hand_out(self, chunks):
+        for worker in self._authenticated():
+            while len(worker.chunks) < self.prefetch:
+                index = self._next_chunk(worker)
+                if index is None: break
+                worker.chunks.append(index)
+                if not self._send(worker, _frame((CHUNK, self._generation, index, chunks[index]))): break
+
+
+    def _next_chunk(self, worker):
+        while self._pending:
+            index = self._pending.popleft()
+            if self._played[index] is None: return index
+
+        # steal the unplayed chunk being played by the fewest workers, the one handed out first among those
+        if worker.chunks: return None
+        copies = collections.Counter(index for other in self._authenticated() for index in other.chunks)
+        stealable = [index for index in copies if index not in worker.chunks and self._played[index] is None]
+        if not stealable: return None
+        self.stolen += 1
+        return min(stealable, key=lambda index: copies[index])
+
+
+    # a new connection is sent its challenge, it becomes a worker once it answers it
+    def _accept(self):
+        try:
+            sock, address = self._listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        worker = _Worker(sock, address)
+        self._workers[sock] = worker
+        self._selector.register(sock, selectors.EVENT_READ)
+        self._send(worker, [_LENGTH.pack(CHALLENGE_SIZE), worker.challenge])
+
+
+    # check a worker's answer to its challenge, and answer its challenge so it knows this is the coordinator,
+    # returns if the worker is still connected
+    def _authenticate(self, worker, answer):
+        proof, challenge = answer[:-CHALLENGE_SIZE], answer[-CHALLENGE_SIZE:]
+        if not hmac.compare_digest(proof, _proof(self.authkey, b"worker", worker.challenge)):
+            self.rejected += 1
+            self._drop(worker)
+            return False
+        worker.challenge = None
+        proof = _proof(self.authkey, b"coordinator", challenge)
+        if not self._send(worker, [_LENGTH.pack(len(proof)), proof]): return False
+        return not self._generation or self._send(worker, self._setup)
+
+
+    def _drop_slow_handshakes(self):
+        for worker in list(self._workers.values()):
+            if not worker.authenticated and time.monotonic() - worker.connected > HANDSHAKE_TIMEOUT:
+                self.rejected += 1
+                self._drop(worker)
+
+
+    # queue the parts of a message from _frame() and send what the socket takes without waiting,
+    # a worker that cannot be reached is dropped, returns if it is still connected
+    def _send(self, worker, parts):
+        worker.outgoing.extend(memoryview(part) for part in parts)
+        return self._flush(worker)
+
+
+    # send as much of a worker's queue as its socket takes, the rest is sent once the selector says it is writable
+    def _flush(self, worker):
+        try:
+            while worker.outgoing:
+                sent = worker.sock.send(worker.outgoing[0])
+                if sent < len(worker.outgoing[0]):
+                    worker.outgoing[0] = worker.outgoing[0][sent:]
+                    break
+                worker.outgoing.popleft()
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(worker)
+            return False
+
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if worker.outgoing else 0)
+        if events != worker.events:
+            self._selector.modify(worker.sock, events)
+            worker.events = events
+        return True
+
+
+    # forget a worker, the chunks nobody else is playing go back to the front of the queue
+    def _drop(self, worker):
+        if worker.sock not in self._workers: return
+        del self._workers[worker.sock]
+        self._selector.unregister(worker.sock)
+        worker.sock.close()
+        worker.outgoing.clear()
+
+        if not self._generation: return
+        playing = set(index for other in self._workers.values() for index in other.chunks)
+        for index in reversed(worker.chunks):
+            if self._played[index] is not None or index in playing: continue
+            self._retries[index] += 1
+            self.retried += 1
+            if self._retries[index] > self.max_retries:
+                raise RuntimeError("Chunk {0} was lost by {1} workers".format(index, self._retries[index]))
+            self._pending.appendleft(index)
+        del worker.chunks[:]
+
+
+# a message pickled once, as the parts Coordinator._send() queues
+def _frame(message):
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    return [_LENGTH.pack(len(data)), data]
+
+
+"""
+Connect to a coordinator and play the chunks it sends until it says to stop or goes away.
+The coordinator has to prove it holds authkey, by default from AUTHKEY_ENV, before anything it sends is unpickled.
+Connecting is retried for up to wait seconds, so workers can be started before the coordinator.
+"""
+def run_worker(host, port=PORT, wait=60, authkey=None):
+    authkey = get_authkey(authkey)
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.monotonic() > deadline: raise
+            time.sleep(0.5)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    generation = None
+    with sock:
+        challenge = _recv_frame(sock, CHALLENGE_SIZE)
+        if challenge is None: raise ConnectionError("The coordinator closed the connection before authenticating")
+        own_challenge = os.urandom(CHALLENGE_SIZE)
+        _send_frame(sock, _proof(authkey, b"worker", challenge) + own_challenge)
+        proof = _recv_frame(sock, hashlib.sha256().digest_size)
+        if proof is None:
+            raise ConnectionError("The coordinator closed the connection, check both use the same {0}".format(
+                AUTHKEY_ENV))
+        if not hmac.compare_digest(proof, _proof(authkey, b"coordinator", own_challenge)):
+            raise ConnectionError("The coordinator failed to authenticate")
+
+        while True:
+            message = recv_message(sock)
+            if message is None or message[0] == STOP: return
+
+            if message[0] == SETUP:
+                generation = message[1]
+                parallel_eval.init_worker(*message[2:])
+            elif message[0] == CHUNK and message[1] == generation:
+                _, _, index, chunk = message
+                results, moves, stats = parallel_eval.play_chunk(chunk)
+                try:
+                    send_message(sock, (RESULT, generation, index, results, moves, stats))
+                except OSError:
+                    return
+
+
+# python distributed_eval.py HOST [PORT] [WORKERS]: start worker processes that play for the coordinator at HOST
+# with the secret key in TRON_AUTHKEY
+if __name__ == "__main__":
+    import multiprocessing
+    import sys
+
+    get_authkey()
+    host = sys.argv[1]
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else PORT
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else multiprocessing.cpu_count()
+    processes = [multiprocessing.Process(target=run_worker, args=(host, port)) for _ in range(workers)]
+    for process in processes: process.start()
+    for process in processes: process.join()
@@ -0,0 +1,170 @@
+# this file stores the fitness functions training can choose from, each one scores a whole generation of games at once
+#
+# Games are scored from their GameOutcome (state, length and final head cells),
+# so outcomes from any engine, the worker pool or the outcome cache are scored without keeping their games around.
+# A fitness function takes the OutcomeArrays of N games and the board.Board they were played on,
+# and returns an (N, 2) array of red and blue fitness.
+# TronCore.get_fitness_* scores a single game with the function of the same name.
+# Training uses the function named in the [TronFitness] section of the neat config file.
+import configparser
+from collections import namedtuple
+import numpy as np
+from TronCore import TronCore
+from board import DEFAULT_BOARD
+
+# fitness functions by name, added with @register
+FITNESS_FUNCTIONS = {}
+# used when the config file does not choose one
+DEFAULT = "wojtek_wall_updated"
+
+# the outcomes of N games as (N,) arrays, states are GameState values
+OutcomeArrays = namedtuple("OutcomeArrays", ["state", "time", "red_x", "red_y", "blue_x", "blue_y"])
+
+_TIE = TronCore.GameState.tie.value
+_RED_WON = TronCore.GameState.red_won.value
+_BLUE_WON = TronCore.GameState.blue_won.value
+
+
+def register(name):
+    def add(function):
+        FITNESS_FUNCTIONS[name] = function
+        return function
+    return add
+
+
+def outcome_arrays(outcomes):
+    outcomes = list(outcomes)
+    columns = np.array([(outcome.state.value, outcome.time) + tuple(outcome.red_loc) + tuple(outcome.blue_loc)
+                        for outcome in outcomes], dtype=np.int64).reshape(len(outcomes), 6)
+    return OutcomeArrays(*columns.T)
+
+
+# red and blue fitness of every GameOutcome as an (N, 2) array
+def score(name, outcomes, board=DEFAULT_BOARD):
+    return FITNESS_FUNCTIONS[name](outcome_arrays(outcomes), board)
+
+
+# name of the fitness function chosen in a neat config file, DEFAULT if it does not choose one
+def from_config(filename):
+    parameters = configparser.ConfigParser()
+    parameters.read(filename)
+    name = parameters.get("TronFitness", "fitness_function", fallback=DEFAULT)
+    if name not in FITNESS_FUNCTIONS:
+        raise ValueError("Unknown fitness function {0}, expected one of {1}".format(
+            name, ", ".join(sorted(FITNESS_FUNCTIONS))))
+    return name
+
+
+# (red fitness, blue fitness) of each game picked from the pair for the way it ended
+def _by_state(state, tie, red_won, blue_won):
+    conditions = [state == _TIE, state == _RED_WON, state == _BLUE_WON]
+    return np.column_stack([np.select(conditions, [tie[i], red_won[i], blue_won[i]], default=np.nan)
+                            for i in range(2)])
+
+
+# pixel coordinates of cells, see TronCore._to_pixel
+def _to_pixel(x, y):
+    return x * TronCore.SNAKE_SPEED, y * TronCore.SNAKE_SPEED + TronCore.ROW_OFFSET
+
+
+# pixel width of a board
+def _grid_size(board):
+    return board.cells * TronCore.SNAKE_SPEED
+
+
+# whether heads are within a cell of the edge of the board, in pixels like the fitness functions were written
+def _hit_wall(x, y, board):
+    px, py = _to_pixel(x, y)
+    edge = _grid_size(board) - TronCore.SNAKE_SPEED
+    return (px < TronCore.SNAKE_SPEED) | (px > edge) | (py < TronCore.SNAKE_SPEED) | (py > edge)
+
+
+def _dist(ax, ay, bx, by):
+    return np.sqrt((ax - bx) ** 2 + (ay - by) ** 2)
+
+
+# calculate the winners fitness
+def _alex_winner(games, board):
+    red_won = games.state == _RED_WON
+    px, py = _to_pixel(np.where(red_won, games.red_x, games.blue_x), np.where(red_won, games.red_y, games.blue_y))
+    red_start = _to_pixel(*board.red_start)
+    blue_start = _to_pixel(*board.blue_start)
+    start_x = np.where(red_won, red_start[0], blue_start[0])
+    start_y = np.where(red_won, red_start[1], blue_start[1])
+
+    # base winning fitness and time spent alive, plus how far away from start they were,
+    # minus how far away from the center they are
+    fitness = 500 + games.time / 4
+    fitness += _dist(px, py, start_x, start_y)
+    fitness -= _dist(_grid_size(board) / 2, _grid_size(board) / 2, px, py)
+    return fitness
+
+
+# the longer the game lasts the less the loser "loses" fitness
+def _alex_loser(games, board):
+    fitness_scalar = 20
+    time_scalar = 6
+    max_time = -(-(_grid_size(board) * _grid_size(board)) // 2)
+    unused_time = max_time - -(-games.time // time_scalar)
+    return -fitness_scalar * unused_time
+
+
+# calculate fitness based on time, winning points, and extra winning points if opposition ran into grid wall
+@register("wojtek_wall")
+def wojtek_wall(games, board):
+    tie_penalty = 50
+    base_win_points = 2000
+    base_loss_points = 200
+    points_wall_collision = 1500
+    t = games.time
+
+    # the blue bonus has always used base_loss_points, kept so old results can be compared
+    return _by_state(games.state, (-tie_penalty, -tie_penalty),
+                     (base_win_points + points_wall_collision * _hit_wall(games.blue_x, games.blue_y, board) + t,
+                      t - base_loss_points),
+                     (t - base_loss_points,
+                      base_win_points + base_loss_points * _hit_wall(games.red_x, games.red_y, board) + t))
+
+
+# the same as wojtek_wall but punishes the loser instead of rewarding the winner when they hit a wall
+@register("wojtek_wall_updated")
+def wojtek_wall_updated(games, board):
+    tie_penalty = 50
+    base_win_points = 2000
+    base_loss_points = 200
+    points_wall_collision = 1500
+    t = games.time
+
+    return _by_state(games.state, (-tie_penalty, -tie_penalty),
+                     (base_win_points + t,
+                      t - base_loss_points - points_wall_collision * _hit_wall(games.blue_x, games.blue_y, board)),
+                     (t - base_loss_points - points_wall_collision * _hit_wall(games.red_x, games.red_y, board),
+                      base_win_points + t))
+
+
+# winner and loser functions
+@register("alex_winner_loser")
+def alex_winner_loser(games, board):
+    tie_penalty = 50
+    winner = _alex_winner(games, board)
+    loser = _alex_loser(games, board)
+    return _by_state(games.state, (-tie_penalty, -tie_penalty), (winner, loser), (loser, winner))
+
+
+# both wall and winner loser functions
+@register("alex_wojtek_combined")
+def alex_wojtek_combined(games, board):
+    return wojtek_wall(games, board) + alex_winner_loser(games, board)
+
+
+# points for time alive, as well as 500 points for the winner
+@register("basic")
+def basic(games, board):
+    t = games.time
+    return _by_state(games.state, (-50, -50), (500 + t, t), (t, 500 + t))
+
+
+# only rewards the winner 500 points, no points for time spent alive
+@register("no_time")
+def no_time(games, board):
+    return _by_state(games.state, (-50, -50), (500, 0), (0, 500))
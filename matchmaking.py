@@ -0,0 +1,346 @@
+# this file stores the matchmaking strategies that decide which genomes play each other in a generation
+#
+# A strategy hands out the games of a generation in rounds.
+# start_generation() is given the population, then next_round() is called with the average fitness
+# every genome has earned so far until it returns an empty round,
+# and end_generation() is called once the population has its final fitness.
+# add_results() is given the games of each round with the (red, blue) fitness each one earned.
+# A game is a (red_id, red_genome, blue_id, blue_genome) tuple, every pairing is played once with each color.
+import copy
+import math
+import random
+from collections import deque
+
+
+# both games of a pairing, once as red then as blue
+def _both_colors(first_id, first, second_id, second):
+    return [(first_id, first, second_id, second), (second_id, second, first_id, first)]
+
+
+# every genome plays every other genome, (N - 1) * 2 games per genome. This is the original schedule.
+class RoundRobin:
+
+    def start_generation(self, genomes):
+        self._genomes = genomes
+        self._done = False
+
+
+    def next_round(self, scores):
+        if self._done: return []
+        self._done = True
+        return [(red_id, red_genome, blue_id, blue_genome)
+                for red_id, red_genome in self._genomes
+                for blue_id, blue_genome in self._genomes
+                if red_id != blue_id]
+
+
+    def add_results(self, games, game_fitness):
+        pass
+
+
+    def end_generation(self, genomes):
+        pass
+
+
+# every genome is paired with k random other genomes, about 4k games per genome
+class RandomOpponents:
+
+    def __init__(self, k):
+        self.k = k
+
+
+    def start_generation(self, genomes):
+        self._genomes = genomes
+        self._done = False
+
+
+    def next_round(self, scores):
+        if self._done: return []
+        self._done = True
+
+        games = []
+        for i, (genome_id, genome) in enumerate(self._genomes):
+            others = [j for j in range(len(self._genomes)) if j != i]
+            for j in random.sample(others, min(self.k, len(others))):
+                games += _both_colors(genome_id, genome, *self._genomes[j])
+        return games
+
+
+    def add_results(self, games, game_fitness):
+        pass
+
+
+    def end_generation(self, genomes):
+        pass
+
+
+# genomes with similar scores so far are paired each round, 2 games per genome per round
+class Swiss:
+
+    def __init__(self, rounds):
+        self.rounds = rounds
+
+
+    def start_generation(self, genomes):
+        # shuffle so the first round, where every score is 0, is random
+        self._genomes = random.sample(list(genomes), len(genomes))
+        self._round = 0
+        self._played = set()
+
+
+    def next_round(self, scores):
+        if self._round >= self.rounds: return []
+        self._round += 1
+
+        # pair the best remaining genome with the closest ranked one it has not played yet
+        waiting = sorted(self._genomes, key=lambda item: scores.get(item[0], 0), reverse=True)
+        games = []
+        while len(waiting) > 1:
+            first_id, first = waiting.pop(0)
+            opponent = next((i for i, (other_id, _) in enumerate(waiting)
+                             if (first_id, other_id) not in self._played), 0)
+            second_id, second = waiting.pop(opponent)
+
+            self._played.add((first_id, second_id))
+            self._played.add((second_id, first_id))
+            games += _both_colors(first_id, first, second_id, second)
+
+        # with an odd population the lowest ranked genome sits out the round
+        return games
+
+
+    def add_results(self, games, game_fitness):
+        pass
+
+
+    def end_generation(self, genomes):
+        pass
+
+
+"""
+Round robin that stops scheduling games for genomes that cannot survive, like successive halving.
+The pairings of a round robin are played opponents_per_round at a time. After each round, every genome has a
+confidence bound of z standard errors around its mean fitness so far. Within each species, neat keeps the
+best survival_threshold of the members as parents (at least 2, and the elites), which sets a cutoff:
+the lower bound of the last genome that would survive. A genome with min_games played whose upper bound
+is below that cutoff is stopped. A pairing is skipped once both of its genomes are stopped.
+Call use_species() with the neat config and species set to take survival_threshold and elitism from the config
+and the species from the population, otherwise the whole population is treated as one species.
+Every audit_every generations the skipped games are played after all, to count how many of the survivors
+picked by racing differ from those of a full round robin, that generation's fitness is the full round robin's.
+"""
+class Racing:
+
+    def __init__(self, opponents_per_round=4, z=2.0, min_games=8, audit_every=0, survival_threshold=0.2, elitism=2):
+        self.opponents_per_round = opponents_per_round
+        self.z = z
+        self.min_games = min_games
+        self.audit_every = audit_every
+        self.survival_threshold = survival_threshold
+        self.elitism = elitism
+        self._species_set = None
+        self._generation = 0
+
+        # how the last generation went, see report()
+        self.games_played = 0
+        self.games_saved = 0
+        self.stopped = 0
+        self.survivors = 0
+        # survivors picked by racing that a full round robin would not have picked, None if it was not audited
+        self.survivor_difference = None
+
+
+    def use_species(self, config, species_set):
+        self.survival_threshold = config.reproduction_config.survival_threshold
+        self.elitism = config.reproduction_config.elitism
+        self._species_set = species_set
+
+
+    # the species set holds neat's reporters, so it is not pickled with the strategy, call use_species() again
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_species_set"] = None
+        return state
+
+
+    def start_generation(self, genomes):
+        # shuffle so which opponents come first is random
+        self._genomes = random.sample(list(genomes), len(genomes))
+        self._rounds = _circle_rounds(len(self._genomes))
+        self._round = 0
+        self._skipped = []
+        self._generation += 1
+        self._audit = bool(self.audit_every) and self._generation % self.audit_every == 0
+        self._racing_fitness = None
+
+        # number of games, sum and sum of squares of the fitness of every genome
+        self._stats = dict((genome_id, [0, 0.0, 0.0]) for genome_id, _ in genomes)
+        self._running = set(self._stats)
+
+        # genome ids of each species
+        self._species = {}
+        genome_to_species = {} if self._species_set is None else self._species_set.genome_to_species
+        for genome_id, _ in genomes:
+            self._species.setdefault(genome_to_species.get(genome_id), []).append(genome_id)
+
+        self.games_played = 0
+        self.games_saved = 0
+        self.stopped = 0
+        self.survivors = sum(self._survivor_count(len(members)) for members in self._species.values())
+        self.survivor_difference = None
+
+
+    def next_round(self, scores):
+        while self._round < len(self._rounds):
+            self._stop_hopeless()
+            rounds = self._rounds[self._round:self._round + self.opponents_per_round]
+            self._round += len(rounds)
+
+            games = []
+            for pairs in rounds:
+                for i, j in pairs:
+                    first_id, first = self._genomes[i]
+                    second_id, second = self._genomes[j]
+                    both = _both_colors(first_id, first, second_id, second)
+                    if first_id in self._running or second_id in self._running: games += both
+                    else: self._skipped += both
+
+            if games:
+                self.games_played += len(games)
+                return games
+
+        self.games_saved = len(self._skipped)
+        if not self._audit or self._racing_fitness is not None: return []
+
+        # play the skipped games too, keeping the fitness racing would have given
+        self._racing_fitness = dict((genome_id, total / games if games else 0.0)
+                                    for genome_id, (games, total, _) in self._stats.items())
+        return self._skipped
+
+
+    def add_results(self, games, game_fitness):
+        for (red_id, _, blue_id, _), (red_fitness, blue_fitness) in zip(games, game_fitness):
+            for genome_id, value in ((red_id, red_fitness), (blue_id, blue_fitness)):
+                stats = self._stats.get(genome_id)
+                if stats is None: continue
+                stats[0] += 1
+                stats[1] += value
+                stats[2] += value * value
+
+
+    def end_generation(self, genomes):
+        if self._racing_fitness is None: return
+        full = self._survivor_ids(dict((genome_id, genome.fitness) for genome_id, genome in genomes))
+        self.survivor_difference = len(self._survivor_ids(self._racing_fitness) - full)
+
+
+    def report(self):
+        total = self.games_played + self.games_saved
+        text = "Racing: {0} of {1} games played, {2} saved ({3:.1%}), {4} genomes stopped early".format(
+            self.games_played, total, self.games_saved, self.games_saved / total if total else 0.0, self.stopped)
+        if self.survivor_difference is not None:
+            text += ", {0} of {1} survivors differ from a full round robin".format(
+                self.survivor_difference, self.survivors)
+        return text
+
+
+    # number of members of a species that are kept as parents or elites, see neat's DefaultReproduction
+    def _survivor_count(self, members):
+        return min(members, max(int(math.ceil(self.survival_threshold * members)), 2, self.elitism))
+
+
+    # stop the running genomes whose upper bound is below the cutoff of their species
+    def _stop_hopeless(self):
+        bounds = {}
+        for genome_id, (games, total, squares) in self._stats.items():
+            if games < 2:
+                bounds[genome_id] = (-math.inf, math.inf)
+                continue
+            mean = total / games
+            error = self.z * math.sqrt(max(0.0, squares - games * mean * mean) / (games - 1) / games)
+            bounds[genome_id] = (mean - error, mean + error)
+
+        for members in self._species.values():
+            survivors = self._survivor_count(len(members))
+            if survivors >= len(members): continue
+            cutoff = sorted((bounds[genome_id][0] for genome_id in members), reverse=True)[survivors - 1]
+            for genome_id in members:
+                if genome_id in self._running and self._stats[genome_id][0] >= self.min_games \
+                        and bounds[genome_id][1] < cutoff:
+                    self._running.remove(genome_id)
+                    self.stopped += 1
+
+
+    # ids of the genomes each species keeps with the given fitness
+    def _survivor_ids(self, fitness):
+        ids = set()
+        for members in self._species.values():
+            ranked = sorted(members, key=lambda genome_id: fitness[genome_id], reverse=True)
+            ids.update(ranked[:self._survivor_count(len(members))])
+        return ids
+
+
+# rounds of a round robin of n players as lists of (i, j) pairs, where every player plays once per round
+# and every pair meets once, made with the circle method: one player stays put while the others rotate around it
+def _circle_rounds(n):
+    players = list(range(n)) + ([None] if n % 2 else [])
+    rounds = []
+    for _ in range(len(players) - 1):
+        rounds.append([(players[i], players[-1 - i]) for i in range(len(players) // 2)
+                       if players[i] is not None and players[-1 - i] is not None])
+        players = [players[0], players[-1]] + players[1:-1]
+    return rounds
+
+
+"""
+Adds games against a bounded hall of fame of past generation winners to another strategy.
+After every round of the other strategy is played, each genome plays every hall of fame member with both colors.
+The best genome of each generation is added at the end of it, the oldest member leaves once it is full.
+use_species() and report() are passed on to the other strategy if it has them, like Racing.
+"""
+class HallOfFame:
+
+    def __init__(self, strategy, size):
+        self.strategy = strategy
+        self.members = deque(maxlen=size)
+
+
+    def use_species(self, config, species_set):
+        if hasattr(self.strategy, "use_species"): self.strategy.use_species(config, species_set)
+
+
+    def report(self):
+        text = "Hall of fame: {0} members".format(len(self.members))
+        if hasattr(self.strategy, "report"): text = self.strategy.report() + "\n" + text
+        return text
+
+
+    def start_generation(self, genomes):
+        self._genomes = genomes
+        self._played_members = False
+        self.strategy.start_generation(genomes)
+
+
+    def next_round(self, scores):
+        games = self.strategy.next_round(scores)
+        if games or self._played_members: return games
+        self._played_members = True
+
+        for genome_id, genome in self._genomes:
+            for member_id, member in self.members:
+                # an elite can still be in the population after joining the hall of fame
+                if member_id != genome_id:
+                    games += _both_colors(genome_id, genome, member_id, member)
+        return games
+
+
+    def add_results(self, games, game_fitness):
+        self.strategy.add_results(games, game_fitness)
+
+
+    def end_generation(self, genomes):
+        self.strategy.end_generation(genomes)
+
+        best_id, best = max(genomes, key=lambda item: item[1].fitness)
+        if best_id not in [member_id for member_id, _ in self.members]:
+            self.members.append((best_id, copy.deepcopy(best)))
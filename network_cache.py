@@ -0,0 +1,55 @@
+# this file stores the cache of neural networks built from genomes during one generation
+import time
+import neat
+
+
+"""
+Builds each genome's network the first time it is needed and reuses it for the rest of the generation.
+Networks are keyed by genome id, so a new cache should be made for every generation.
+It also keeps count of how many builds it skipped to report the construction time it saved.
+"""
+class NetworkCache:
+
+    def __init__(self, config):
+        self._config = config
+        self._nets = {}
+
+        # stats for the report
+        self.builds = 0
+        self.reuses = 0
+        self.build_time = 0.0
+
+
+    def get(self, genome_id, genome):
+        net = self._nets.get(genome_id)
+        if net is None:
+            start = time.perf_counter()
+            net = neat.nn.FeedForwardNetwork.create(genome, self._config)
+            self.build_time += time.perf_counter() - start
+            self.builds += 1
+            self._nets[genome_id] = net
+        else:
+            self.reuses += 1
+        return net
+
+
+    # current stats, so stats from caches in other processes can be added together with add_stats()
+    def get_stats(self):
+        return self.builds, self.reuses, self.build_time
+
+
+    def add_stats(self, builds, reuses, build_time):
+        self.builds += builds
+        self.reuses += reuses
+        self.build_time += build_time
+
+
+    # estimated construction time saved, every reuse would have cost an average build
+    def time_saved(self):
+        if self.builds == 0: return 0.0
+        return self.reuses * self.build_time / self.builds
+
+
+    def report(self):
+        return "Networks built: {0} in {1:.3f} sec, reused {2} times saving ~{3:.3f} sec".format(
+            self.builds, self.build_time, self.reuses, self.time_saved())
@@ -0,0 +1,78 @@
+# this file stores the cache of game outcomes shared across generations
+#
+# Games are fully deterministic given the two networks, and elites and unchanged genomes
+# carry over between generations, so some pairings get played again.
+# Outcomes are keyed by a structural hash of both genomes so a pairing is only ever simulated once,
+# and by the settings the game was played with, so changing the board, endgame or percepts never reuses an old outcome.
+# Pairings rarely repeat: in 15 generations of 40 genomes under 3% of games were cached with any matchmaker
+# but the hall of fame, which repeats about 8%.
+import hashlib
+from collections import OrderedDict
+
+
+# hash of everything that goes into a genome's network: its nodes, connections, weights and activations
+# genomes with equal hashes play identically, whatever their genome id
+def genome_hash(genome):
+    nodes = sorted((key, node.bias, node.response, node.activation, node.aggregation)
+                   for key, node in genome.nodes.items())
+    connections = sorted((key, conn.weight, conn.enabled) for key, conn in genome.connections.items())
+    return hashlib.blake2b(repr((nodes, connections)).encode(), digest_size=16).hexdigest()
+
+
+# key of everything other than the two genomes that decides how a game ends:
+# the board.Board size and starts, the endgame mode and the percept set
+def settings_key(board, endgame, percept_set):
+    return board.cells, board.start, endgame, percept_set
+
+
+"""
+Bounded cache of GameOutcomes keyed by (settings key, red genome hash, blue genome hash),
+outcomes played with other settings are never returned.
+Once it holds max_size outcomes the least recently used one is evicted.
+"""
+class OutcomeCache:
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self._outcomes = OrderedDict()
+
+        # stats for the report
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def __len__(self):
+        return len(self._outcomes)
+
+
+    # the outcome of a pairing played with settings from settings_key(), or None if it has not been played yet
+    def get(self, settings, red_hash, blue_hash):
+        key = (settings, red_hash, blue_hash)
+        outcome = self._outcomes.get(key)
+        if outcome is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._outcomes.move_to_end(key)
+        return outcome
+
+
+    def put(self, settings, red_hash, blue_hash, outcome):
+        key = (settings, red_hash, blue_hash)
+        self._outcomes[key] = outcome
+        self._outcomes.move_to_end(key)
+        while len(self._outcomes) > self.max_size:
+            self._outcomes.popitem(last=False)
+            self.evictions += 1
+
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if lookups == 0: return 0.0
+        return self.hits / lookups
+
+
+    def report(self):
+        return "Outcome cache: {0} hits, {1} misses ({2:.1%} hit rate), {3} stored, {4} evicted".format(
+            self.hits, self.misses, self.hit_rate(), len(self), self.evictions)
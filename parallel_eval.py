@@ -0,0 +1,225 @@
+# this file stores the functions for playing a generation's matchups across a pool of worker processes
+#
+# A WorkerPool starts its processes once and keeps them for the whole training run.
+# Each generation the workers are sent the settings once, and every genome the first time one of its games is played,
+# so later rounds of the same generation (Swiss, Racing) only send the games themselves.
+import multiprocessing
+import multiprocessing.connection
+import pickle
+import traceback
+from TronCore import TronCore
+from network_cache import NetworkCache
+from ai_inputs import BASIC
+
+# kinds of messages between a WorkerPool and its workers
+_SETUP = "setup"
+_GENOMES = "genomes"
+_CHUNK = "chunk"
+_RESULT = "result"
+_ERROR = "error"
+_STOP = "stop"
+
+# state of the generation being evaluated, set once in each worker process by init_worker()
+# distributed_eval workers play their chunks with the same functions
+# genomes that play in this generation, keyed by genome id
+_genomes = None
+# networks built by this worker
+_nets = None
+# endgame mode games are played with
+_endgame = None
+# whether games are recorded
+_record = False
+# board.Board games are played on
+_board = None
+# percept set the networks are given
+_percept_set = None
+
+
+def init_worker(genomes, config, endgame, record, board, percept_set):
+    global _genomes, _nets, _endgame, _record, _board, _percept_set
+    _genomes = genomes
+    _nets = NetworkCache(config)
+    _endgame = endgame
+    _record = record
+    _board = board
+    _percept_set = percept_set
+
+
+# add genomes to the ones of this generation
+def add_genomes(genomes):
+    _genomes.update(genomes)
+
+
+def _get_net(genome_id):
+    return _nets.get(genome_id, _genomes[genome_id])
+
+
+# play a chunk of (red_id, blue_id) games,
+# returns the GameOutcome and recorded moves of each game in order, and how the network cache stats changed
+def play_chunk(chunk):
+    stats_before = _nets.get_stats()
+    results = []
+    moves = []
+    for red_id, blue_id in chunk:
+        game = TronCore(ai_red_net=_get_net(red_id), ai_blue_net=_get_net(blue_id), endgame=_endgame, record=_record,
+                        board=_board, percept_set=_percept_set)
+        game.run_to_end()
+        results.append(game.get_outcome())
+        moves.append(game.get_moves())
+
+    stats_change = [after - before for before, after in zip(stats_before, _nets.get_stats())]
+    return results, moves, stats_change
+
+
+# the loop of a WorkerPool process, plays the chunks sent over connection until it is told to stop
+def _serve(connection):
+    while True:
+        try:
+            message = pickle.loads(connection.recv_bytes())
+        except EOFError:
+            return
+        try:
+            if message[0] == _STOP: return
+            if message[0] == _SETUP: init_worker({}, *message[1:])
+            elif message[0] == _GENOMES: add_genomes(message[1])
+            elif message[0] == _CHUNK:
+                results, moves, stats = play_chunk(message[2])
+                connection.send_bytes(pickle.dumps((_RESULT, message[1], results, moves, stats),
+                                                   protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            connection.send_bytes(pickle.dumps((_ERROR, traceback.format_exc())))
+
+
+"""
+Worker processes that play matchups, started once and reused by every call of play_matchups() until close().
+"""
+class WorkerPool:
+
+    def __init__(self, workers, prefetch=2):
+        self.workers = workers
+        self.prefetch = prefetch
+        self._connections = []
+        self._processes = []
+        for _ in range(workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_serve, args=(worker_connection,), daemon=True)
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+        # generation and settings the workers were last set up with, and the genome ids they have been sent since
+        self._generation = None
+        self._setup = None
+        self._sent = set()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    """
+    Play a list of (red_id, red_genome, blue_id, blue_genome) games on the workers,
+    with the same arguments and results as play_matchups() apart from the number of workers.
+    Calls with the same generation, which is any value that changes every generation, reuse the genomes
+    and networks the workers already have. Without one every call starts over.
+    """
+    def play_matchups(self, games, config, network_cache=None, endgame=None, record=False, board=None,
+                      percept_set=BASIC, generation=None):
+        setup = (config, endgame, record, board, percept_set)
+        if generation is None or generation != self._generation or self._setup is None \
+                or any(new is not old and new != old for new, old in zip(setup, self._setup)):
+            self._broadcast((_SETUP,) + setup)
+            self._generation = generation
+            self._setup = setup
+            self._sent = set()
+
+        genomes = {}
+        for red_id, red_genome, blue_id, blue_genome in games:
+            if red_id not in self._sent: genomes[red_id] = red_genome
+            if blue_id not in self._sent: genomes[blue_id] = blue_genome
+        if genomes:
+            self._broadcast((_GENOMES, genomes))
+            self._sent.update(genomes)
+
+        # a few chunks per worker keeps them all busy without sending every game separately
+        ids = [(red_id, blue_id) for red_id, _, blue_id, _ in games]
+        chunk_size = max(1, len(ids) // (self.workers * 4))
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        played = [None] * len(chunks)
+
+        # every worker is kept up to prefetch chunks ahead, the next one goes to whichever finishes first
+        waiting = dict((connection, 0) for connection in self._connections)
+        next_chunk = 0
+        remaining = len(chunks)
+        while remaining:
+            for connection in self._connections:
+                while waiting[connection] < self.prefetch and next_chunk < len(chunks):
+                    connection.send_bytes(pickle.dumps((_CHUNK, next_chunk, chunks[next_chunk]),
+                                                       protocol=pickle.HIGHEST_PROTOCOL))
+                    waiting[connection] += 1
+                    next_chunk += 1
+
+            for connection in multiprocessing.connection.wait([c for c in self._connections if waiting[c]]):
+                try:
+                    message = pickle.loads(connection.recv_bytes())
+                except EOFError:
+                    raise RuntimeError("A worker process stopped while playing games")
+                if message[0] == _ERROR: raise RuntimeError("A worker failed to play its games:\n" + message[1])
+                _, index, results, moves, stats_change = message
+                played[index] = (results, moves, stats_change)
+                waiting[connection] -= 1
+                remaining -= 1
+
+        results = []
+        moves = []
+        for chunk_results, chunk_moves, stats_change in played:
+            if network_cache is not None: network_cache.add_stats(*stats_change)
+            results += chunk_results
+            moves += chunk_moves
+
+        if record: return results, moves
+        return results
+
+
+    # send a message to every worker, it is pickled once for all of them
+    def _broadcast(self, message):
+        data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        for connection in self._connections: connection.send_bytes(data)
+
+
+    # stop the worker processes
+    def close(self):
+        for connection in self._connections:
+            try:
+                connection.send_bytes(pickle.dumps((_STOP,)))
+            except OSError:
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join(5)
+            if process.is_alive(): process.terminate()
+        self._connections = []
+        self._processes = []
+
+
+"""
+Play a list of (red_id, red_genome, blue_id, blue_genome) games using a pool of worker processes
+started for this call only, keep a WorkerPool to reuse the workers across rounds and generations.
+Each worker receives the genomes and config once, builds networks locally,
+and plays the games in chunks of consecutive games.
+Returns the GameOutcome of every game in the same order as the games,
+so adding up their fitness in order gives identical fitness values to a serial run.
+Network cache stats from the workers are added to network_cache if one is given.
+Games are played with the endgame mode given, see endgame.py.
+If record is set the moves of every game are returned as well, see TronCore.get_moves().
+Games are played on board, the default board.Board if it is None, with the percepts of percept_set.
+"""
+def play_matchups(games, config, workers, network_cache=None, endgame=None, record=False, board=None,
+                  percept_set=BASIC):
+    with WorkerPool(workers) as pool:
+        return pool.play_matchups(games, config, network_cache, endgame, record, board, percept_set)
@@ -0,0 +1,113 @@
+# this file stores the profiler that times each phase of a game tick and of eval_genomes
+#
+# Profiling is off unless a Profiler is set as TronCore.PROFILER and NeatManager.PROFILER.
+# While it is off a tick only checks that the profiler is None between phases.
+# While it is on, mark() adds the time since the previous mark to a phase,
+# and a ProfileReporter appends each generation's totals to a file as a line of JSON or rows of CSV,
+# so it keeps nothing in memory and saving a generation takes as long in the last generation as in the first.
+import contextlib
+import csv
+import json
+import os
+import time
+import neat
+
+
+class Profiler:
+
+    def __init__(self):
+        self.reset()
+
+
+    # forget everything measured so far
+    def reset(self):
+        # seconds and number of calls of every phase
+        self.seconds = {}
+        self.calls = {}
+        # number of ticks and games played
+        self.ticks = 0
+        self.games = 0
+        self._last = time.perf_counter()
+
+
+    # end the current phase, the time since the last mark is added to it
+    # without a phase this only starts timing, like at the start of a tick
+    def mark(self, phase=None):
+        now = time.perf_counter()
+        if phase is not None: self.add(phase, now - self._last)
+        self._last = now
+
+
+    def add(self, phase, seconds, calls=1):
+        self.seconds[phase] = self.seconds.get(phase, 0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + calls
+
+
+    def end_tick(self, game_over):
+        self.ticks += 1
+        if game_over: self.games += 1
+
+
+    # time the code inside a with block as a phase
+    @contextlib.contextmanager
+    def phase(self, phase):
+        start = time.perf_counter()
+        yield
+        self.add(phase, time.perf_counter() - start)
+
+
+    """
+    Totals of every phase, as a list of dicts of phase, seconds, calls and seconds per game.
+    Phases of eval_genomes contain each other, play contains networks and every tick phase.
+    """
+    def summary(self):
+        return [{"phase": phase, "seconds": seconds, "calls": self.calls[phase],
+                 "seconds_per_game": seconds / self.games if self.games else 0.0}
+                for phase, seconds in sorted(self.seconds.items(), key=lambda item: -item[1])]
+
+
+# a phase of profiler, or a with block that does nothing if profiler is None
+def timed(profiler, phase):
+    if profiler is None: return contextlib.nullcontext()
+    return profiler.phase(phase)
+
+
+"""
+A neat reporter that saves what a Profiler measured in every generation, then resets it.
+With format "ndjson" path gets a line of {"generation", "ticks", "games", "phases"} JSON for every generation,
+with "csv" it gets a row for every phase of every generation.
+append keeps what path already holds, as when training resumes.
+"""
+class ProfileReporter(neat.reporting.BaseReporter):
+
+    def __init__(self, profiler, path, format="ndjson", append=False):
+        if format not in ("ndjson", "csv"):
+            raise ValueError("Unknown profile format {0}, expected ndjson or csv".format(format))
+        self.profiler = profiler
+        self.path = path
+        self.format = format
+        self._generation = None
+
+        if append and os.path.exists(path): return
+        with open(path, "w", newline="") as f:
+            if format == "csv":
+                csv.writer(f).writerow(["generation", "ticks", "games", "phase", "seconds", "calls", "seconds_per_game"])
+
+
+    def start_generation(self, generation):
+        self._generation = generation
+        self.profiler.reset()
+
+
+    def post_evaluate(self, config, population, species, best_genome):
+        record = {"generation": self._generation, "ticks": self.profiler.ticks, "games": self.profiler.games,
+                  "phases": self.profiler.summary()}
+
+        with open(self.path, "a", newline="") as f:
+            if self.format == "ndjson":
+                f.write(json.dumps(record) + "\n")
+            else:
+                writer = csv.writer(f)
+                for phase in record["phases"]:
+                    writer.writerow([record["generation"], record["ticks"], record["games"], phase["phase"],
+                                     phase["seconds"], phase["calls"], phase["seconds_per_game"]])
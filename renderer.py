@@ -0,0 +1,63 @@
+# this file stores the renderer that draws games straight onto the Tk canvas of a turtle screen
+#
+# Drawing a square with turtle takes a dozen turtle calls that each redraw the canvas.
+# Instead a rectangle is created once for every cell of the board,
+# after that a frame only recolors the cells that changed since the last one.
+
+
+"""
+Draws a board of cells onto a turtle screen.
+Cells are colored with set_cell() or draw_grid(), then show_frame() is called once per game tick.
+Only cells whose color changed are sent to the canvas, and with frame_skip set only one of every
+frame_skip + 1 frames is drawn, so a game is not slowed down by how long drawing takes.
+flush() draws whatever has changed right away, it should be called once a game ends.
+"""
+class CanvasRenderer:
+
+    def __init__(self, screen, cells, background="black", frame_skip=0):
+        self._screen = screen
+        self._canvas = screen.getcanvas()
+        self.cells = cells
+        self.frame_skip = frame_skip
+        self._frames = 0
+
+        # turtle's canvas has (0, 0) in the center of the window and y growing downwards
+        cell_size = min(screen.window_width(), screen.window_height()) // cells
+        left = -cell_size * cells // 2
+        bottom = cell_size * cells // 2
+
+        screen.bgcolor(background)
+        # the rectangle of cell x, y is at x * cells + y, like the flat indexes of the ray index
+        self._rects = [self._canvas.create_rectangle(left + x * cell_size, bottom - (y + 1) * cell_size,
+                                                     left + (x + 1) * cell_size, bottom - y * cell_size,
+                                                     fill=background, outline=background)
+                       for x in range(cells) for y in range(cells)]
+        self._shown = [background] * (cells * cells)
+        # colors cells have been given since the last frame that was drawn
+        self._dirty = {}
+
+
+    def set_cell(self, x, y, color):
+        self._dirty[x * self.cells + y] = color
+
+
+    # color every occupied cell of a (cells, cells) bool grid
+    def draw_grid(self, p_bodies, color):
+        for x, column in enumerate(p_bodies.tolist()):
+            for y, occupied in enumerate(column):
+                if occupied: self.set_cell(x, y, color)
+
+
+    # end of a game tick, draws the changes unless this frame is skipped
+    def show_frame(self):
+        self._frames += 1
+        if self._frames % (self.frame_skip + 1) == 0: self.flush()
+
+
+    def flush(self):
+        for i, color in self._dirty.items():
+            if self._shown[i] != color:
+                self._canvas.itemconfig(self._rects[i], fill=color, outline=color)
+                self._shown[i] = color
+        self._dirty.clear()
+        self._screen.update()
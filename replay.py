@@ -0,0 +1,188 @@
+# this file stores the replay archive, games recorded during training that can be watched again without their networks
+#
+# A game is stored as its board size, starting conditions and the direction both snakes moved in every tick,
+# 2 bits per snake per tick. Games are appended to a data file, and an index file keeps
+# a fixed size entry per game with its generation, genome ids, outcome and where its moves are.
+# Both files are memory mapped when read, so an archive can be far larger than memory.
+import mmap
+import os
+import struct
+from collections import namedtuple
+import numpy as np
+from TronCore import TronCore, GameOutcome
+from board import Board
+
+# start is a (red_loc, red_aim, blue_loc, blue_aim) tuple of (x, y) cells and directions like TronCore.reset() takes,
+# moves is a list of (red direction, blue direction) indexes into TronCore.DIRECTIONS, one per tick played
+# cells is the size of the board.Board it was played on
+Replay = namedtuple("Replay", ["generation", "red_id", "blue_id", "start", "moves", "outcome", "cells"])
+
+# board size, start cells, start directions and number of ticks at the front of every game's data
+_HEADER = struct.Struct("<H4h2BI")
+
+INDEX_DTYPE = np.dtype([("generation", "<u4"), ("red_id", "<i8"), ("blue_id", "<i8"),
+                        ("offset", "<u8"), ("size", "<u4"),
+                        ("state", "u1"), ("time", "<u4"),
+                        ("red_x", "<i2"), ("red_y", "<i2"), ("blue_x", "<i2"), ("blue_y", "<i2")])
+
+
+# the data of one game, two ticks are packed in each byte of moves with the first tick in the low bits
+def encode(cells, start, moves):
+    (red_x, red_y), red_aim, (blue_x, blue_y), blue_aim = start
+    codes = np.zeros(len(moves) + len(moves) % 2, dtype=np.uint8)
+    if moves:
+        directions = np.array(moves, dtype=np.uint8)
+        codes[:len(moves)] = directions[:, 0] << 2 | directions[:, 1]
+    return (_HEADER.pack(cells, red_x, red_y, blue_x, blue_y,
+                         TronCore.DIRECTIONS.index(tuple(red_aim)), TronCore.DIRECTIONS.index(tuple(blue_aim)),
+                         len(moves))
+            + (codes[0::2] | codes[1::2] << 4).tobytes())
+
+
+# the board size, start and moves of a game from its data
+def decode(data):
+    cells, red_x, red_y, blue_x, blue_y, red_aim, blue_aim, ticks = _HEADER.unpack_from(data)
+    packed = np.frombuffer(data, dtype=np.uint8, offset=_HEADER.size)
+    codes = np.column_stack([packed & 0xF, packed >> 4]).ravel()[:ticks]
+    start = ((red_x, red_y), TronCore.DIRECTIONS[red_aim], (blue_x, blue_y), TronCore.DIRECTIONS[blue_aim])
+    return cells, start, list(zip((codes >> 2).tolist(), (codes & 3).tolist()))
+
+
+"""
+A game in the state a recorded game was in after its first tick ticks, to play on from there,
+for example with other networks or after taking a snapshot() to try several continuations.
+Keyword arguments like the networks are passed on to TronCore, it is played on a board of the replay's size.
+"""
+def game_at(replay, tick, **kwargs):
+    kwargs.setdefault("board", Board(replay.cells))
+    game = TronCore(**kwargs)
+    game.reset(replay.start)
+    for red_direction, blue_direction in replay.moves[:tick]:
+        game.step(red_direction, blue_direction)
+    return game
+
+
+"""
+Appends recorded games to the archive at path, which is made of the files path.bin and path.idx.
+Games are added with add(), they are written out in blocks and by flush() or close().
+"""
+class ReplayWriter:
+
+    def __init__(self, path, buffer_size=1000):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._data = open(path + ".bin", "ab")
+        self._index = open(path + ".idx", "ab")
+        self._offset = self._data.tell()
+        self._entries = []
+        self._chunks = []
+
+
+    # add a finished game that was played with record=True
+    def add(self, generation, red_id, blue_id, game):
+        self.add_moves(generation, red_id, blue_id, game.get_board().cells, game.get_start(), game.get_moves(),
+                       game.get_outcome())
+
+
+    def add_moves(self, generation, red_id, blue_id, cells, start, moves, outcome):
+        data = encode(cells, start, moves)
+        self._entries.append((generation, red_id, blue_id, self._offset, len(data), outcome.state.value, outcome.time)
+                             + tuple(outcome.red_loc) + tuple(outcome.blue_loc))
+        self._chunks.append(data)
+        self._offset += len(data)
+        if len(self._entries) >= self.buffer_size: self.flush()
+
+
+    def flush(self):
+        if not self._entries: return
+        # data is written before the index so an index entry never points past the end of the data
+        self._data.write(b"".join(self._chunks))
+        self._data.flush()
+        self._index.write(np.array(self._entries, dtype=INDEX_DTYPE).tobytes())
+        self._index.flush()
+        self._entries = []
+        self._chunks = []
+
+
+    def close(self):
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+
+"""
+Reads the archive at path without loading it into memory.
+index is a memory mapped structured array of INDEX_DTYPE with an entry per game, in the order they were added.
+"""
+class ReplayArchive:
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.getsize(path + ".idx"):
+            self.index = np.memmap(path + ".idx", dtype=INDEX_DTYPE, mode="r")
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+
+        with open(path + ".bin", "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path + ".bin") else b""
+
+
+    def __len__(self):
+        return len(self.index)
+
+
+    # numbers of the games that match every given generation and genome id
+    def find(self, generation=None, red_id=None, blue_id=None):
+        matches = np.ones(len(self.index), dtype=bool)
+        if generation is not None: matches &= self.index["generation"] == generation
+        if red_id is not None: matches &= self.index["red_id"] == red_id
+        if blue_id is not None: matches &= self.index["blue_id"] == blue_id
+        return np.flatnonzero(matches).tolist()
+
+
+    def get(self, number):
+        entry = self.index[number]
+        cells, start, moves = decode(self._data[int(entry["offset"]):int(entry["offset"]) + int(entry["size"])])
+        outcome = GameOutcome(TronCore.GameState(int(entry["state"])), int(entry["time"]),
+                              (int(entry["red_x"]), int(entry["red_y"])), (int(entry["blue_x"]), int(entry["blue_y"])))
+        return Replay(int(entry["generation"]), int(entry["red_id"]), int(entry["blue_id"]), start, moves, outcome,
+                      cells)
+
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap): self._data.close()
+
+
+"""
+Outcome statistics of every game in an archive, read from the index only,
+chunk_size entries at a time so the archive can hold any number of games.
+Returns a dict keyed by generation of {"games", state name: count, "mean_time", "max_time"}.
+"""
+def outcome_stats(path, chunk_size=1 << 20):
+    index = ReplayArchive(path).index
+    totals = {}
+    for begin in range(0, len(index), chunk_size):
+        chunk = index[begin:begin + chunk_size]
+        for generation in np.unique(chunk["generation"]).tolist():
+            games = chunk[chunk["generation"] == generation]
+            stats = totals.setdefault(generation, dict([("games", 0), ("time", 0), ("max_time", 0)] +
+                                                        [(state.name, 0) for state in TronCore.GameState]))
+            stats["games"] += len(games)
+            stats["time"] += int(games["time"].sum())
+            stats["max_time"] = max(stats["max_time"], int(games["time"].max()))
+            for state in TronCore.GameState:
+                stats[state.name] += int((games["state"] == state.value).sum())
+
+    for stats in totals.values():
+        stats["mean_time"] = stats.pop("time") / stats["games"]
+    return totals
+
+
+# print the outcome statistics of an archive by generation
+if __name__ == "__main__":
+    import sys
+
+    for generation, stats in sorted(outcome_stats(sys.argv[1]).items()):
+        print("generation {0}: {1} games, red won {2}, blue won {3}, tie {4}, mean time {5:.1f}, max time {6}".format(
+            generation, stats["games"], stats["red_won"], stats["blue_won"], stats["tie"],
+            stats["mean_time"], stats["max_time"]))
@@ -0,0 +1,252 @@
+# this file stores the search agent, a fixed opponent evolved genomes can be measured against
+#
+# It plays like a network, TronCore asks it for an action with act(game, red) instead of activate(percepts).
+# Each move it searches the game with alpha-beta, deepening one tick at a time until its time budget runs out.
+# Both snakes move at once, so the search is paranoid: the opponent picks its move knowing the agent's.
+# Positions are kept as bit sets of free cells like endgame.py, and scored by how many cells
+# each snake reaches before the other (territory.race). Positions already searched are looked up
+# by Zobrist hash in a transposition table, which also gives the move to try first on the next deepening.
+import random
+import time
+from TronCore import TronCore
+import endgame
+import territory
+
+# score of a won game, anything at least this large is a proven result
+WIN = 1 << 20
+
+# kinds of transposition table entries: the exact value, or a bound the value is at least or at most
+EXACT, LOWER, UPPER = range(3)
+
+# the direction index a snake cannot turn to from each direction, TronCore ignores 180 degree turns
+_OPPOSITE = [1, 0, 3, 2]
+
+# how many nodes are searched between checks of the clock
+_CLOCK_NODES = 64
+
+# move and hash tables of each board size, see _tables()
+_TABLES = {}
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+"""
+A search player with the same place in a game as a network.
+time_budget is the seconds each move may take, None to always search max_depth ticks deep,
+which plays the same moves on any machine.
+The transposition table keeps up to table_size positions and is cleared once it is full.
+"""
+class SearchAgent:
+
+    def __init__(self, time_budget=0.005, max_depth=32, table_size=1 << 18):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self._table = {}
+        # what the last move searched: depth completed, nodes and value
+        self.depth = 0
+        self.nodes = 0
+        self.value = 0
+
+
+    # index of the direction to move in, see TronCore.DIRECTIONS
+    def act(self, game, red):
+        board = game.get_board()
+        if board.sparse:
+            raise ValueError("The search agent keeps the board as a bit set, it can only play on dense boards")
+        cells = board.cells
+        steps, cell_keys, head_keys, side_key = _tables(cells)
+
+        red_loc, red_aim, blue_loc, blue_aim = game.get_heads()
+        if not red: red_loc, red_aim, blue_loc, blue_aim = blue_loc, blue_aim, red_loc, red_aim
+        mine = (red_loc[0] * cells + red_loc[1], TronCore.DIRECTIONS.index(red_aim))
+        theirs = (blue_loc[0] * cells + blue_loc[1], TronCore.DIRECTIONS.index(blue_aim))
+
+        free = endgame.free_cells(game.get_bodies())
+        filled = ~free & ((1 << cells * cells) - 1)
+        key = (0 if red else side_key) ^ head_keys[0][mine[0] * 4 + mine[1]] ^ head_keys[1][theirs[0] * 4 + theirs[1]]
+        while filled:
+            low = filled & -filled
+            key ^= cell_keys[low.bit_length() - 1]
+            filled ^= low
+
+        if len(self._table) > self.table_size: self._table.clear()
+        self._cells = cells
+        self._steps = steps
+        self._cell_keys = cell_keys
+        self._head_keys = head_keys
+        self._deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        self.nodes = 0
+
+        # a move that does not crash right away, in case not even the first depth finishes
+        move = self._ordered(free, mine, None)[0]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                self.value = self._search(free, mine, theirs, key, depth, -2 * WIN, 2 * WIN)
+            except _OutOfTime:
+                break
+            move = self._table[key][3]
+            self.depth = depth
+            # nothing deeper can change a proven result
+            if abs(self.value) >= WIN: break
+        return move
+
+
+    """
+    Value of a position for the agent when both snakes still have depth ticks to play,
+    mine and theirs are the (cell, direction) of the agent's and the opponent's heads.
+    """
+    def _search(self, free, mine, theirs, key, depth, alpha, beta):
+        self.nodes += 1
+        if self._deadline is not None and self.nodes % _CLOCK_NODES == 0 and time.perf_counter() > self._deadline:
+            raise _OutOfTime()
+
+        entry = self._table.get(key)
+        table_move = None
+        if entry is not None:
+            entry_depth, value, kind, table_move = entry
+            if entry_depth >= depth:
+                if kind == EXACT: return value
+                if kind == LOWER and value >= beta: return value
+                if kind == UPPER and value <= alpha: return value
+
+        if depth == 0:
+            return self._evaluate(free, mine[0], theirs[0])
+
+        steps = self._steps
+        cell_keys = self._cell_keys
+        mine_keys, theirs_keys = self._head_keys
+        original_alpha = alpha
+        best, best_move = -2 * WIN, None
+        replies = self._ordered(free, theirs, None)
+        for move in self._ordered(free, mine, table_move):
+            cell = steps[mine[0]][move]
+            mine_dead = cell < 0 or not free >> cell & 1
+
+            # the opponent answers each move with the reply that is worst for the agent
+            worst = 2 * WIN
+            for reply in replies:
+                other = steps[theirs[0]][reply]
+                theirs_dead = other < 0 or not free >> other & 1
+                if mine_dead or theirs_dead or cell == other:
+                    # sooner results are worth more, depth is the ticks that were left to play
+                    if cell == other or mine_dead and theirs_dead: value = 0
+                    elif mine_dead: value = -WIN - depth
+                    else: value = WIN + depth
+                else:
+                    value = self._search(free & ~(1 << cell) & ~(1 << other), (cell, move), (other, reply),
+                                         key ^ mine_keys[mine[0] * 4 + mine[1]] ^ mine_keys[cell * 4 + move]
+                                         ^ theirs_keys[theirs[0] * 4 + theirs[1]] ^ theirs_keys[other * 4 + reply]
+                                         ^ cell_keys[cell] ^ cell_keys[other],
+                                         depth - 1, alpha, min(beta, worst))
+                if value < worst: worst = value
+                # this move is already no better than one searched before
+                if worst <= alpha: break
+
+            if worst > best: best, best_move = worst, move
+            if best > alpha: alpha = best
+            if alpha >= beta: break
+
+        if best <= original_alpha: kind = UPPER
+        elif best >= beta: kind = LOWER
+        else: kind = EXACT
+        self._table[key] = (depth, best, kind, best_move)
+        return best
+
+
+    # cells the agent reaches first minus cells the opponent reaches first
+    def _evaluate(self, free, mine, theirs):
+        cells = self._cells
+        claimed, other_claimed = territory.race(free, self._neighbors(mine), self._neighbors(theirs), cells)
+        return claimed - other_claimed
+
+
+    def _neighbors(self, cell):
+        bits = 0
+        for target in self._steps[cell]:
+            if target >= 0: bits |= 1 << target
+        return bits
+
+
+    """
+    Directions a snake can move in, best first: the move the transposition table found best,
+    then moves into free cells with the most free cells around them, then moves that crash.
+    """
+    def _ordered(self, free, snake, table_move):
+        cell, aim = snake
+        steps = self._steps
+        ranked = []
+        for move in range(4):
+            if move == _OPPOSITE[aim]: continue
+            target = steps[cell][move]
+            if target < 0 or not free >> target & 1:
+                rank = -1
+            else:
+                rank = sum(1 for next_cell in steps[target] if next_cell >= 0 and free >> next_cell & 1)
+            if move == table_move: rank = 5
+            ranked.append((rank, move))
+        ranked.sort(reverse=True)
+        return [move for _, move in ranked]
+
+
+"""
+Tables of a board size, built once:
+the cell each direction leads to from every cell (-1 off the board, like moving below row 0 onto the wall),
+and random Zobrist keys of every filled cell, of each snake's head at every (cell, direction),
+and of which color the agent is playing.
+"""
+def _tables(cells):
+    if cells not in _TABLES:
+        steps = []
+        for x in range(cells):
+            for y in range(cells):
+                steps.append([(x + dx) * cells + y + dy if 0 <= x + dx < cells and 0 <= y + dy < cells else -1
+                              for dx, dy in TronCore.DIRECTIONS])
+
+        rng = random.Random(cells)
+        cell_keys = [rng.getrandbits(64) for _ in range(cells * cells)]
+        head_keys = ([rng.getrandbits(64) for _ in range(cells * cells * 4)],
+                     [rng.getrandbits(64) for _ in range(cells * cells * 4)])
+        _TABLES[cells] = (steps, cell_keys, head_keys, rng.getrandbits(64))
+    return _TABLES[cells]
+
+
+# play the saved winners against the search agent with both colors, and report how often each side won
+if __name__ == "__main__":
+    import argparse
+    import os
+    import pickle
+    import neat
+
+    parser = argparse.ArgumentParser(description="Play the saved winners against the search agent")
+    parser.add_argument("--budget", type=float, default=0.005, help="seconds the agent may take per move")
+    parser.add_argument("--depth", type=int, default=32, help="deepest the agent searches")
+    args = parser.parse_args()
+
+    local_dir = os.path.dirname(os.path.abspath(__file__))
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                os.path.join(local_dir, "config-feedforward.txt"))
+    agent = SearchAgent(args.budget, args.depth)
+
+    start = time.perf_counter()
+    games = 0
+    for name in ["winner1", "winner10", "winner20", "winner30", "winner40", "winner50", "winnerALL"]:
+        with open(os.path.join(local_dir, name + ".pkl"), "rb") as f:
+            net = neat.nn.FeedForwardNetwork.create(pickle.load(f), config)
+
+        wins = losses = ties = ticks = 0
+        for red, blue in [(net, agent), (agent, net)]:
+            game = TronCore(ai_red_net=red, ai_blue_net=blue)
+            state = game.run_to_end()
+            ticks += game.get_outcome().time
+            games += 1
+            if state == TronCore.GameState.tie: ties += 1
+            elif (state == TronCore.GameState.red_won) == (red is net): wins += 1
+            else: losses += 1
+        print("{0:<10} won {1}, lost {2}, tied {3} against the agent, {4} ticks".format(name, wins, losses, ties, ticks))
+
+    seconds = time.perf_counter() - start
+    print("{0} games in {1:.1f}s, {2:.0f} games per hour".format(games, seconds, games * 3600 / seconds))
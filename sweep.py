@@ -0,0 +1,239 @@
+# this file stores the sweep runner, which trains every combination of a grid of config settings side by side
+#
+#   python sweep.py --set pop_size=20,40 --set compatibility_threshold=2,3 --fitness basic no_time --seeds 0 1
+#
+# Every run gets its own directory in --out with its config file, training log, stats, checkpoints and winner.
+# Runs are trained by a shared pool of processes, each one with a fresh NeatManager, and a global budget of --cpus:
+# with --workers-per-run W, cpus // W runs train at once and each plays its games on W processes.
+# Running the same sweep again skips the runs that finished, and resumes the others from their newest checkpoint.
+# Once every run is done, a table compares them, it is also saved to summary.csv in --out.
+import argparse
+import concurrent.futures
+import configparser
+import contextlib
+import csv
+import json
+import os
+import pickle
+import random
+import re
+import time
+import checkpoint
+import fitness
+from training_stats import read_stats
+
+# sections of settings that are not in every neat config file
+EXTRA_SECTIONS = {"fitness_function": "TronFitness", "percept_set": "TronPercepts"}
+
+# columns of the comparison table, as (heading, result key, format)
+TABLE = [("run", "name", "{0}"), ("gen", "generations", "{0}"), ("gen/s", "generations_per_second", "{0:.2f}"),
+         ("best", "best_fitness", "{0:.1f}"), ("mean", "fitness_mean", "{0:.1f}"),
+         ("median", "fitness_median", "{0:.1f}"), ("species", "species", "{0}"),
+         ("size", "best_size", "{0}"), ("ticks", "time_mean", "{0:.1f}"), ("tie", "tie", "{0:.0%}")]
+
+
+"""
+The runs of a grid, as dicts of name, overrides and seed.
+settings is a list of (setting, [values]) tuples, every combination of values is trained once per seed.
+A setting is a key of the config file, or section.key where a key is in more than one section.
+"""
+def grid(settings, seeds):
+    runs = []
+    for values in _product([values for _, values in settings]):
+        overrides = dict(zip([setting for setting, _ in settings], values))
+        for seed in seeds:
+            parts = ["{0}-{1}".format(setting.split(".")[-1], value) for setting, value in overrides.items()]
+            name = re.sub(r"[^\w.-]", "_", "_".join(parts + ["seed-{0}".format(seed)]))
+            runs.append({"name": name, "overrides": overrides, "seed": seed})
+    return runs
+
+
+def _product(lists):
+    if not lists: return [[]]
+    return [[value] + rest for value in lists[0] for rest in _product(lists[1:])]
+
+
+# write the config file base_path with the overrides of a run to path
+def write_config(base_path, overrides, path):
+    parameters = configparser.ConfigParser()
+    parameters.read(base_path)
+    for setting, value in overrides.items():
+        section, key = _section(parameters, setting)
+        if not parameters.has_section(section): parameters.add_section(section)
+        parameters.set(section, key, str(value))
+
+    with open(path, "w") as f:
+        parameters.write(f)
+
+
+# (section, key) of a setting in the config file
+def _section(parameters, setting):
+    if "." in setting: return setting.split(".", 1)
+    sections = [section for section in parameters.sections() if parameters.has_option(section, setting)]
+    if not sections and setting in EXTRA_SECTIONS: return EXTRA_SECTIONS[setting], setting
+    if len(sections) != 1:
+        raise ValueError("The setting {0} is in {1} sections of the config file, name it as section.{0}".format(
+            setting, len(sections) or "no"))
+    return sections[0], setting
+
+
+# whether a run directory holds a run trained for at least generations
+def is_complete(run_dir, generations):
+    path = os.path.join(run_dir, "result.json")
+    if not os.path.exists(path): return False
+    with open(path) as f:
+        return json.load(f)["generations"] >= generations
+
+
+"""
+Train a run in run_dir, resuming from its newest checkpoint if it has one, and save its result.json.
+This runs in a pool process of its own, so NeatManager's settings are only changed for this run.
+"""
+def train(run, run_dir, base_config, generations, workers):
+    import NeatManager
+
+    os.makedirs(run_dir, exist_ok=True)
+    config_path = os.path.join(run_dir, "config.txt")
+    if not os.path.exists(config_path):
+        write_config(base_config, run["overrides"], config_path)
+        with open(os.path.join(run_dir, "run.json"), "w") as f:
+            json.dump(run, f, indent=2)
+
+    NeatManager.GENERATIONS = generations
+    NeatManager.SNAPSHOTS = []
+    NeatManager.RENDER_LAST = False
+    NeatManager.WORKERS = workers
+    NeatManager.OUT_DIR = run_dir
+    resume = checkpoint.latest(os.path.join(run_dir, NeatManager.CHECKPOINT_DIR))
+
+    with open(os.path.join(run_dir, "train.log"), "a") as log, contextlib.redirect_stdout(log):
+        if resume is None:
+            random.seed(run["seed"])
+            NeatManager.run(config_path)
+        else:
+            NeatManager.run(config_path, resume)
+
+    result = dict(run, generations=generations, **summarize(run_dir, NeatManager.STATS_PATH))
+    temporary = os.path.join(run_dir, "result.json.tmp")
+    with open(temporary, "w") as f:
+        json.dump(result, f, indent=2)
+    os.replace(temporary, os.path.join(run_dir, "result.json"))
+    return result
+
+
+"""
+What a finished run did, from its stats file and winner.
+Generations per second counts the time spent evaluating each generation, so it is the same for resumed runs.
+"""
+def summarize(run_dir, stats_path):
+    seconds = 0.0
+    last = None
+    for record in read_stats(os.path.join(run_dir, stats_path)):
+        seconds += record["seconds"]
+        last = record
+
+    with open(os.path.join(run_dir, "winnerALL.pkl"), "rb") as f:
+        winner = pickle.load(f)
+    nodes, connections = winner.size()
+    return {"seconds": seconds, "generations_per_second": (last["generation"] + 1) / seconds if seconds else 0.0,
+            "best_fitness": winner.fitness, "best_size": "{0}/{1}".format(nodes, connections),
+            "fitness_mean": last["fitness_mean"], "fitness_median": last["fitness_median"],
+            "species": last["species"], "time_mean": last["time_mean"], "tie": last["tie"]}
+
+
+"""
+Train every run that is not complete in out, cpus // workers runs at a time, and return the results of all runs.
+A run that fails is reported and left to be resumed by the next sweep, the others go on.
+"""
+def sweep(runs, out, base_config, generations, cpus, workers=1):
+    pending = [run for run in runs if not is_complete(os.path.join(out, run["name"]), generations)]
+    print("{0} of {1} runs to train".format(len(pending), len(runs)))
+
+    if pending:
+        processes = max(1, min(len(pending), cpus // workers))
+        # a process per run, so every run starts with NeatManager's defaults
+        with concurrent.futures.ProcessPoolExecutor(processes, max_tasks_per_child=1) as pool:
+            futures = dict((pool.submit(train, run, os.path.join(out, run["name"]), base_config, generations, workers),
+                            run) for run in pending)
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    result = future.result()
+                    print("{0} done, best fitness {1:.1f}, {2:.2f} generations per second".format(
+                        result["name"], result["best_fitness"], result["generations_per_second"]))
+                except Exception as error:
+                    print("{0} failed: {1!r}".format(futures[future]["name"], error))
+
+    return load_results(runs, out)
+
+
+# results of the runs that are complete, in the order of runs
+def load_results(runs, out):
+    results = []
+    for run in runs:
+        path = os.path.join(out, run["name"], "result.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                results.append(json.load(f))
+    return results
+
+
+# the comparison table of results as text, also saved as csv to path
+def table(results, path=None):
+    rows = [[heading for heading, _, _ in TABLE]]
+    for result in results:
+        rows.append(["" if result[key] is None else text.format(result[key]) for _, key, text in TABLE])
+
+    if path is not None:
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([key for _, key, _ in TABLE])
+            for result in results: writer.writerow([result[key] for _, key, _ in TABLE])
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(TABLE))]
+    return "\n".join("  ".join(cell.ljust(width) if i == 0 else cell.rjust(width)
+                               for i, (cell, width) in enumerate(zip(row, widths)))
+                     for row in rows)
+
+
+if __name__ == "__main__":
+    local_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Train a grid of config settings and fitness functions")
+    parser.add_argument("--config", default=os.path.join(local_dir, "config-feedforward.txt"),
+                        help="neat config file the settings of every run are changed in")
+    parser.add_argument("--set", action="append", default=[], metavar="SETTING=VALUE,VALUE",
+                        help="values of a config setting to train with, can be given more than once")
+    parser.add_argument("--fitness", nargs="+", default=[], metavar="NAME",
+                        help="fitness functions to train with, or all of them: " + ", ".join(fitness.FITNESS_FUNCTIONS))
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0], help="seeds every combination is trained with")
+    parser.add_argument("--generations", type=int, default=50, help="number of generations of every run")
+    parser.add_argument("--cpus", type=int, default=os.cpu_count(), help="processes all runs may use together")
+    parser.add_argument("--workers-per-run", type=int, default=1, help="processes each run plays its games on")
+    parser.add_argument("--out", default="sweep", help="directory the runs are saved in")
+    parser.add_argument("--table", action="store_true", help="only print the table of the runs that are done")
+    args = parser.parse_args()
+
+    settings = []
+    for text in args.set:
+        setting, _, values = text.partition("=")
+        settings.append((setting.strip(), [value.strip() for value in values.split(",")]))
+    if args.fitness:
+        names = sorted(fitness.FITNESS_FUNCTIONS) if args.fitness == ["all"] else args.fitness
+        for name in names:
+            if name not in fitness.FITNESS_FUNCTIONS: parser.error("Unknown fitness function " + name)
+        settings.append(("fitness_function", names))
+
+    runs = grid(settings, args.seeds)
+    # check every setting is in the config file before training anything
+    parameters = configparser.ConfigParser()
+    parameters.read(args.config)
+    for setting, _ in settings: _section(parameters, setting)
+
+    os.makedirs(args.out, exist_ok=True)
+    if args.table:
+        results = load_results(runs, args.out)
+    else:
+        start = time.perf_counter()
+        results = sweep(runs, args.out, args.config, args.generations, args.cpus, args.workers_per_run)
+        print("sweep took {0:.1f}s".format(time.perf_counter() - start))
+    print(table(results, os.path.join(args.out, "summary.csv")))
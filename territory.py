@@ -0,0 +1,126 @@
+# this file stores the territory index behind the extended percepts: how much room each move leads to,
+# and how much of the board each snake can get to before its opponent
+#
+# The free cells are kept as disjoint regions, each one a bit set of x * cells + y in a python int like endgame.py.
+# Filling a cell takes it out of its region, and only when endgame.may_cut() says the fill could have split
+# the region is that one region flood filled again, so most ticks cost a few bit operations
+# instead of a flood fill of the whole board.
+import endgame
+
+
+"""
+Regions of free cells on a dense board, kept up to date as the snakes fill cells.
+reach() is the size of the region a move would enter, territory() the Voronoi split of the cells the heads can reach.
+"""
+class Territory:
+
+    def __init__(self, p_bodies):
+        self.cells = p_bodies.shape[-1]
+        self._p_bodies = p_bodies
+        free = endgame.free_cells(p_bodies)
+        # free cells of the empty board, percepts are scaled by it
+        self.area = endgame.region_size(free)
+        # [bit set, number of cells] of every region
+        self.regions = _split(free, self.cells)
+
+
+    # a copy that keeps its regions up to date for the given bodies, which must hold the same cells as this one's
+    def copy(self, p_bodies):
+        territory = Territory.__new__(Territory)
+        territory.cells = self.cells
+        territory._p_bodies = p_bodies
+        territory.area = self.area
+        territory.regions = [region.copy() for region in self.regions]
+        return territory
+
+
+    # take the cell x, y out of its region after a body was placed on it,
+    # cut is endgame.may_cut() for the cell if the caller already knows it
+    def fill(self, x, y, cut=None):
+        bit = 1 << (x * self.cells + y)
+        for i, (region, size) in enumerate(self.regions):
+            if not region & bit: continue
+
+            region ^= bit
+            if cut is None: cut = endgame.may_cut(self._p_bodies, x, y)
+            if cut:
+                self.regions[i:i + 1] = _split(region, self.cells)
+            elif size > 1:
+                self.regions[i] = [region, size - 1]
+            else:
+                del self.regions[i]
+            return
+
+
+    # number of free cells reachable through each of the cells north, south, east and west of x, y,
+    # 0 where that cell is not free
+    def reach(self, x, y):
+        cells = self.cells
+        i = x * cells + y
+        north = 1 << (i + 1) if y + 1 < cells else 0
+        south = 1 << (i - 1) if y > 0 else 0
+        east = 1 << (i + cells) if x + 1 < cells else 0
+        west = 1 << (i - cells) if x > 0 else 0
+
+        sizes = [0, 0, 0, 0]
+        for region, size in self.regions:
+            if region & north: sizes[0] = size
+            if region & south: sizes[1] = size
+            if region & east: sizes[2] = size
+            if region & west: sizes[3] = size
+        return sizes
+
+
+    """
+    Number of free cells each head reaches strictly before the other, as a (cells, other cells) tuple.
+    A region only one head can enter is all its own without searching,
+    the regions both can enter are split with race().
+    """
+    def territory(self, loc, other_loc):
+        cells = self.cells
+        front = endgame.neighbors(loc, cells)
+        other_front = endgame.neighbors(other_loc, cells)
+        mine = theirs = 0
+        shared = 0
+        for region, size in self.regions:
+            if region & front:
+                if region & other_front: shared |= region
+                else: mine += size
+            elif region & other_front:
+                theirs += size
+        if not shared: return mine, theirs
+
+        claimed, other_claimed = race(shared, front, other_front, cells)
+        return mine + claimed, theirs + other_claimed
+
+
+"""
+Number of cells of free each of two sets of starting cells reaches strictly before the other, as a tuple.
+Both sets grow outwards a step at a time, all cells of a step at once as bit operations,
+cells reached by both on the same step count for neither.
+"""
+def race(free, front, other_front, cells):
+    below_top, above_bottom = endgame.row_masks(cells)
+    front &= free
+    other_front &= free
+    seen = front | other_front
+    claimed = other_claimed = 0
+    while front or other_front:
+        claimed |= front & ~other_front
+        other_claimed |= other_front & ~front
+        unseen = free & ~seen
+        front = (front << cells | front >> cells | (front & below_top) << 1 | (front & above_bottom) >> 1) & unseen
+        other_front = (other_front << cells | other_front >> cells
+                       | (other_front & below_top) << 1 | (other_front & above_bottom) >> 1) & unseen
+        seen |= front | other_front
+    return endgame.region_size(claimed), endgame.region_size(other_claimed)
+
+
+# the connected regions of a set of free cells, as [bit set, number of cells] lists
+def _split(free, cells):
+    regions = []
+    while free:
+        region = endgame.flood(free & -free, free, cells)
+        regions.append([region, endgame.region_size(region)])
+        free ^= region
+    return regions
@@ -1,12 +1,22 @@
 import os
+import sys
 import pickle
 import neat
-import turtle
 from TronGame import TronGame
+from replay import ReplayArchive
+import ai_inputs
 
-# create screen
-main_screen = turtle.Screen()
-main_screen.setup(402, 402)
+# screen games are shown on, created when the first one is played so importing this file opens no window
+main_screen = None
+
+
+def get_screen():
+    global main_screen
+    if main_screen is None:
+        import turtle
+        main_screen = turtle.Screen()
+        main_screen.setup(402, 402)
+    return main_screen
 
 
 # change the file name to which generation's best you want to play
@@ -19,6 +29,9 @@ def replay_genome(config_file, genome_path="winnerALL.pkl"):
         neat.DefaultStagnation,
         config_file
     )
+    # the genome was trained on the percepts the config file chooses
+    percept_set = ai_inputs.from_config(config_file)
+    ai_inputs.set_num_inputs(config.genome_config, percept_set)
 
     # Unpickle the winner
     with open(genome_path, "rb") as f:
@@ -30,20 +43,44 @@ def replay_genome(config_file, genome_path="winnerALL.pkl"):
     # play against genome as red
     while True:
         game = TronGame(graphics_enable=True,
-                        screen=main_screen,
+                        screen=get_screen(),
                         keep_window_open=False,
                         ai_red_net=None,
                         ai_blue_net=blue_net,
                         delay=100,
                         debug_text=False,
-                        end_text=False)
+                        end_text=False,
+                        percept_set=percept_set)
+        game.start_game()
+        get_screen().clear()
+
+
+# play back the games recorded in a replay archive, no networks are needed
+def play_back(archive_path, generation=None, red_id=None, blue_id=None):
+    archive = ReplayArchive(archive_path)
+    for number in archive.find(generation, red_id, blue_id):
+        replay = archive.get(number)
+        print("generation", replay.generation, "genome", replay.red_id, "vs genome", replay.blue_id)
+        game = TronGame(graphics_enable=True,
+                        screen=get_screen(),
+                        keep_window_open=False,
+                        replay=replay,
+                        delay=100,
+                        debug_text=False,
+                        end_text=True)
         game.start_game()
-        main_screen.clear()
+        get_screen().clear()
+
 
+if __name__ == "__main__":
+    # play back an archive instead if one is given: python test.py replays [generation]
+    if len(sys.argv) > 1:
+        play_back(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else None)
+        sys.exit()
 
-# get directory of repo
-local_dir = os.path.dirname(__file__)
-# add on the name of the neat config file
-config_path = os.path.join(local_dir, "config-feedforward.txt")
-# load genome and have it play blue
-replay_genome(config_path)
+    # get directory of repo
+    local_dir = os.path.dirname(__file__)
+    # add on the name of the neat config file
+    config_path = os.path.join(local_dir, "config-feedforward.txt")
+    # load genome and have it play blue
+    replay_genome(config_path)
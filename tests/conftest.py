@@ -0,0 +1,5 @@
+# this file lets the tests import the modules of the repository from any directory pytest is run in
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,48 @@
+# this file stores the tests of the ray index, checked against one rebuilt from the bodies after every fill
+import random
+import numpy as np
+import pytest
+from ai_inputs import RayIndex
+
+
+@pytest.mark.parametrize("cells", [1, 2, 5, 12])
+@pytest.mark.parametrize("seed", range(5))
+def test_fill_matches_a_rebuild(cells, seed):
+    rng = random.Random(seed)
+    # some cells start out as walls, like a board with obstacles
+    p_bodies = np.array([[rng.random() < 0.1 for _ in range(cells)] for _ in range(cells)])
+    rays = RayIndex(p_bodies)
+
+    # fill the free cells in a random order
+    free = [(x, y) for x in range(cells) for y in range(cells) if not p_bodies[x, y]]
+    rng.shuffle(free)
+    for x, y in free:
+        p_bodies[x, y] = True
+        rays.fill(x, y)
+        rebuilt = RayIndex(p_bodies)
+        assert rays.runs == rebuilt.runs
+        assert all(rays.dists(i, j) == rebuilt.dists(i, j) for i in range(cells) for j in range(cells))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_undo_matches_a_rebuild(seed):
+    rng = random.Random(seed)
+    cells = 9
+    p_bodies = np.zeros((cells, cells), dtype=bool)
+    rays = RayIndex(p_bodies)
+    log = []
+    # bodies and the length of the log after every fill
+    history = []
+    free = [(x, y) for x in range(cells) for y in range(cells)]
+    rng.shuffle(free)
+    for x, y in free:
+        p_bodies[x, y] = True
+        rays.fill(x, y, log)
+        assert rays.runs == RayIndex(p_bodies).runs
+        history.append((p_bodies.copy(), len(log)))
+
+    for bodies, length in reversed(history):
+        rays.undo(log, length)
+        assert rays.runs == RayIndex(bodies).runs
+    rays.undo(log, 0)
+    assert rays.runs == RayIndex(np.zeros((cells, cells), dtype=bool)).runs
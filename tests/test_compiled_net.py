@@ -0,0 +1,42 @@
+# this file stores the tests of compiled_net, checked against neat's own FeedForwardNetwork on random genomes
+import os
+import random
+import numpy as np
+import pytest
+import neat
+from compiled_net import CompiledNetworks
+
+LOCAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def config():
+    return neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                              neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                              os.path.join(LOCAL_DIR, "config-feedforward.txt"))
+
+
+# a new genome mutated enough times to have hidden nodes, several layers and a mix of activations
+def random_genome(config, key, mutations):
+    genome = neat.DefaultGenome(key)
+    genome.configure_new(config.genome_config)
+    for _ in range(mutations):
+        genome.mutate(config.genome_config)
+        # splitting a connection is what makes networks deeper, the config rarely does it on its own
+        genome.mutate_add_node(config.genome_config)
+    return genome
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_activate_matches_feed_forward_network(config, seed):
+    random.seed(seed)
+    nets = [neat.nn.FeedForwardNetwork.create(random_genome(config, key, mutations), config)
+            for key, mutations in enumerate([0, 1, 5, 10, 20, 40])]
+    compiled = CompiledNetworks(nets)
+
+    rng = np.random.default_rng(seed)
+    inputs = rng.uniform(-1, 1, (200, config.genome_config.num_inputs))
+    net_indexes = rng.integers(len(nets), size=len(inputs))
+
+    expected = [nets[p].activate(x) for p, x in zip(net_indexes.tolist(), inputs.tolist())]
+    np.testing.assert_allclose(compiled.activate(net_indexes, inputs), expected, rtol=1e-9, atol=1e-12)
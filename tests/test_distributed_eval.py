@@ -0,0 +1,138 @@
+# this file stores the tests of distributed_eval, a coordinator and several workers on localhost
+import multiprocessing
+import os
+import pickle
+import random
+import socket
+import time
+import neat
+import pytest
+import distributed_eval
+from distributed_eval import Coordinator, run_worker
+from TronCore import TronCore
+
+LOCAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUTHKEY = b"test key"
+
+
+# every pairing of a small random population, as play_matchups() takes them
+@pytest.fixture(scope="module")
+def games():
+    random.seed(472)
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                os.path.join(LOCAL_DIR, "config-feedforward.txt"))
+    config.pop_size = 8
+    genomes = list(neat.population.Population(config).population.items())
+    return config, [(red_id, red, blue_id, blue) for red_id, red in genomes for blue_id, blue in genomes
+                    if red_id != blue_id]
+
+
+def play_serially(games, config):
+    outcomes = []
+    for _, red, _, blue in games:
+        game = TronCore(ai_red_net=neat.nn.FeedForwardNetwork.create(red, config),
+                        ai_blue_net=neat.nn.FeedForwardNetwork.create(blue, config))
+        game.run_to_end()
+        outcomes.append(game.get_outcome())
+    return outcomes
+
+
+@pytest.fixture
+def coordinator():
+    coordinator = Coordinator(port=0, chunk_size=4, wait=20, authkey=AUTHKEY)
+    yield coordinator
+    coordinator.close()
+
+
+def start_workers(coordinator, count, authkey=AUTHKEY):
+    workers = [multiprocessing.Process(target=run_worker, args=coordinator.address, kwargs={"authkey": authkey},
+                                       daemon=True)
+               for _ in range(count)]
+    for worker in workers: worker.start()
+    return workers
+
+
+def test_listens_on_localhost_by_default(monkeypatch):
+    monkeypatch.setenv(distributed_eval.AUTHKEY_ENV, "key")
+    coordinator = Coordinator(port=0)
+    try:
+        assert coordinator.address[0] == "127.0.0.1"
+    finally:
+        coordinator.close()
+
+
+def test_needs_a_key(monkeypatch):
+    monkeypatch.delenv(distributed_eval.AUTHKEY_ENV, raising=False)
+    with pytest.raises(ValueError):
+        Coordinator(port=0)
+
+
+def test_several_workers_match_a_serial_run(games):
+    config, games = games
+    coordinator = Coordinator(port=0, chunk_size=4, wait=20, authkey=AUTHKEY)
+    workers = start_workers(coordinator, 3)
+    try:
+        assert coordinator.play_matchups(games, config) == play_serially(games, config)
+        # a second generation reuses the same workers
+        assert coordinator.play_matchups(games[::-1], config) == play_serially(games[::-1], config)
+        assert coordinator.worker_count() == 3
+    finally:
+        coordinator.close()
+
+    # closing tells the workers to stop
+    for worker in workers:
+        worker.join(10)
+        assert worker.exitcode == 0
+
+
+def test_lost_worker_chunks_are_played_again(games, coordinator):
+    config, games = games
+    workers = start_workers(coordinator, 2)
+    coordinator.play_matchups(games[:4], config)
+    workers[0].kill()
+    assert coordinator.play_matchups(games, config) == play_serially(games, config)
+
+
+def test_wrong_key_is_rejected(games, coordinator):
+    config, games = games
+    workers = start_workers(coordinator, 1)
+    impostor = start_workers(coordinator, 1, authkey=b"wrong key")[0]
+    assert coordinator.play_matchups(games, config) == play_serially(games, config)
+    impostor.join(10)
+    assert impostor.exitcode != 0
+    assert coordinator.worker_count() == len(workers)
+    assert coordinator.rejected == 1
+
+
+# a pickle that would create a file when loaded
+class _Exploit:
+
+    def __init__(self, path):
+        self.path = path
+
+
+    def __reduce__(self):
+        return open, (self.path, "w")
+
+
+def test_nothing_is_unpickled_before_authenticating(games, coordinator, tmp_path, monkeypatch):
+    config, games = games
+    monkeypatch.setattr(distributed_eval, "HANDSHAKE_TIMEOUT", 1)
+    path = str(tmp_path / "exploited")
+    data = pickle.dumps(_Exploit(path))
+
+    # one connection sends a pickle instead of answering, another never answers at all
+    attacker = socket.create_connection(coordinator.address)
+    attacker.sendall(distributed_eval._LENGTH.pack(len(data)) + data)
+    silent = socket.create_connection(coordinator.address)
+    start_workers(coordinator, 2)
+    start = time.monotonic()
+    assert coordinator.play_matchups(games, config) == play_serially(games, config)
+    while coordinator.rejected < 2 and time.monotonic() - start < 10:
+        coordinator.play_matchups(games[:1], config)
+
+    assert coordinator.rejected == 2
+    assert not os.path.exists(path)
+    attacker.close()
+    silent.close()
@@ -0,0 +1,54 @@
+# this file stores the tests of the endgame, checked against a flood fill of the board on every tick
+import random
+import pytest
+import endgame
+from TronCore import TronCore
+from board import Board
+
+
+# a player that turns at random, and mostly avoids running into bodies so games last
+class RandomPlayer:
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+
+    def act(self, game, red):
+        heads = game.get_heads()
+        (x, y), (aim_x, aim_y) = heads[:2] if red else heads[2:]
+        bodies = game.get_bodies()
+        safe = [action for action, (dx, dy) in enumerate(TronCore.DIRECTIONS)
+                if (dx, dy) != (-aim_x, -aim_y) and not bodies[x + dx, y + dy]]
+        if safe and self.rng.random() < 0.9: return self.rng.choice(safe)
+        return self.rng.randrange(len(TronCore.DIRECTIONS))
+
+
+# the first tick the heads can no longer reach a common cell and whether a head was trapped on it,
+# (None, False) if they always can
+def first_separated(seed, board):
+    player = RandomPlayer(seed)
+    game = TronCore(ai_red_net=player, ai_blue_net=player, board=board)
+    while game.get_outcome().state == TronCore.GameState.ongoing:
+        game._update()
+        if game.get_outcome().state != TronCore.GameState.ongoing: break
+        split = endgame.regions(game.get_bodies(), game._red_loc, game._blue_loc)
+        if split is not None: return game.get_outcome().time, not all(split)
+    return None, False
+
+
+# a head with no free cell next to it dies on the next tick, finding that early saves nothing,
+# any other separation has to be found on the tick it happens
+@pytest.mark.parametrize("cells", [8, 10, 12])
+def test_separation_is_found_on_the_tick_it_happens(cells):
+    board = Board(cells=cells)
+    separated = 0
+    for seed in range(300):
+        player = RandomPlayer(seed)
+        game = TronCore(ai_red_net=player, ai_blue_net=player, endgame=endgame.RESOLVE, board=board)
+        game.run_to_end()
+        reported = (game.get_endgame() or (None,))[0]
+        tick, trapped = first_separated(seed, board)
+        if trapped: assert reported in (tick, None), seed
+        else: assert reported == tick, seed
+        separated += tick is not None and not trapped
+    assert separated > 50
@@ -0,0 +1,66 @@
+# this file stores the tests of the replay archive, recorded games played back from it must end the same way
+import random
+import pytest
+from TronCore import TronCore
+from board import Board
+import replay
+from replay import ReplayWriter, ReplayArchive
+
+BOARDS = [Board(cells=8), Board(cells=25), Board(cells=11, red_start=(3, 2), blue_start=(7, 8), red_dir=(0, 1))]
+
+
+# a direction that mostly turns at random into a free cell, and sometimes anywhere
+def random_direction(game, red, rng):
+    heads = game.get_heads()
+    (x, y), (aim_x, aim_y) = heads[:2] if red else heads[2:]
+    bodies = game.get_bodies()
+    safe = [action for action, (dx, dy) in enumerate(TronCore.DIRECTIONS)
+            if (dx, dy) != (-aim_x, -aim_y) and not bodies[x + dx, y + dy]]
+    if safe and rng.random() < 0.95: return rng.choice(safe)
+    return rng.randrange(len(TronCore.DIRECTIONS))
+
+
+# a recorded game of random moves played until it ends
+def random_game(board, rng):
+    game = TronCore(record=True, board=board)
+    while game.get_outcome().state == TronCore.GameState.ongoing:
+        game.step(random_direction(game, True, rng), random_direction(game, False, rng))
+    return game
+
+
+@pytest.mark.parametrize("moves", [[], [(0, 1)], [(3, 2), (1, 1), (0, 3)], [(i % 4, i // 4 % 4) for i in range(64)]])
+def test_encode_round_trip(moves):
+    start = ((3, 4), (1, 0), (9, 4), (-1, 0))
+    assert replay.decode(replay.encode(12, start, moves)) == (12, start, moves)
+
+
+def test_archived_games_play_back_the_same(tmp_path):
+    rng = random.Random(472)
+    path = str(tmp_path / "replays")
+    # a small buffer so the games are written in several blocks
+    writer = ReplayWriter(path, buffer_size=7)
+    games = []
+    for generation in range(3):
+        for number in range(20):
+            game = random_game(rng.choice(BOARDS), rng)
+            writer.add(generation, number, number + 1, game)
+            games.append(game)
+    writer.close()
+
+    archive = ReplayArchive(path)
+    assert len(archive) == len(games)
+    assert archive.find(generation=1, red_id=4) == [24]
+    for number, game in enumerate(games):
+        recorded = archive.get(number)
+        assert (recorded.generation, recorded.red_id, recorded.blue_id) == (number // 20, number % 20, number % 20 + 1)
+        assert recorded.moves == game.get_moves()
+        assert recorded.outcome == game.get_outcome()
+
+        # played back a tick at a time the game only ends on its last tick, as it did when it was recorded
+        played = replay.game_at(recorded, 0)
+        for red_direction, blue_direction in recorded.moves:
+            assert played.get_outcome().state == TronCore.GameState.ongoing
+            played.step(red_direction, blue_direction)
+        assert played.get_outcome() == game.get_outcome()
+        assert played.get_board().cells == recorded.cells
+    archive.close()
@@ -0,0 +1,111 @@
+# this file stores the tests of TronCore.snapshot(), restore() and clone(),
+# a game taken back or copied and played on with the same moves must go exactly like one played straight through
+import random
+import pytest
+import endgame
+from TronCore import TronCore
+from board import Board
+from ai_inputs import BASIC, TERRITORY
+
+
+# a player that turns at random, and mostly avoids running into bodies so games last
+# every action is kept by (tick, red) in actions, including the ticks a fast forwarded snake plays alone
+class RandomPlayer:
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.actions = {}
+
+
+    def act(self, game, red):
+        heads = game.get_heads()
+        (x, y), (aim_x, aim_y) = heads[:2] if red else heads[2:]
+        bodies = game.get_bodies()
+        safe = [action for action, (dx, dy) in enumerate(TronCore.DIRECTIONS)
+                if (dx, dy) != (-aim_x, -aim_y) and not bodies[x + dx, y + dy]]
+        if safe and self.rng.random() < 0.9: action = self.rng.choice(safe)
+        else: action = self.rng.randrange(len(TronCore.DIRECTIONS))
+        self.actions[game.get_outcome().time, red] = action
+        return action
+
+
+# a player that makes the actions a RandomPlayer made again, red and blue share one
+class ScriptedPlayer:
+
+    def __init__(self, actions):
+        self.actions = actions
+
+
+    def act(self, game, red):
+        return self.actions[game.get_outcome().time, red]
+
+
+# (board, percept set, endgame mode) of the games played, the sparse board has no territory or endgame
+SETUPS = [(Board(cells=10), BASIC, None), (Board(cells=10), TERRITORY, endgame.RESOLVE),
+          (Board(cells=14), TERRITORY, endgame.FAST_FORWARD), (Board(cells=12, sparse=True), BASIC, None)]
+
+
+# everything a game could differ in after a tick, bodies are read a cell at a time so sparse ones compare too
+def state(game):
+    outcome = game.get_outcome()
+    bodies = game.get_bodies()
+    cells = game.get_board().cells
+    percepts = game.get_percepts() if outcome.state == TronCore.GameState.ongoing else None
+    return (outcome, game.get_heads(), [[bool(bodies[x, y]) for y in range(cells)] for x in range(cells)],
+            percepts, game.get_endgame())
+
+
+def new_game(setup, player):
+    board, percept_set, mode = setup
+    return TronCore(ai_red_net=player, ai_blue_net=player, endgame=mode, record=True, board=board,
+                    percept_set=percept_set)
+
+
+# the state after every tick of a game played straight through, its moves and its players' actions
+def play_straight(setup, rng):
+    player = RandomPlayer(rng)
+    game = new_game(setup, player)
+    states = [state(game)]
+    while game.get_outcome().state == TronCore.GameState.ongoing:
+        game._update()
+        states.append(state(game))
+    return states, game.get_moves(), player.actions
+
+
+@pytest.mark.parametrize("setup", SETUPS)
+def test_restore_plays_on_like_a_straight_game(setup):
+    rng = random.Random(472)
+    for _ in range(40):
+        states, moves, actions = play_straight(setup, rng)
+        game = new_game(setup, ScriptedPlayer(actions))
+        for tick in range(len(states) - 1):
+            snapshot = game.snapshot()
+            # wander off for a few ticks with other moves, then come back
+            for _ in range(rng.randrange(1, 6)):
+                if game.get_outcome().state != TronCore.GameState.ongoing: break
+                game.step(rng.randrange(4), rng.randrange(4))
+            game.restore(snapshot)
+            assert state(game) == states[tick]
+            game._update()
+            assert state(game) == states[tick + 1]
+        assert game.get_moves() == moves
+
+
+@pytest.mark.parametrize("setup", SETUPS)
+def test_clone_plays_on_like_a_straight_game(setup):
+    rng = random.Random(472)
+    for _ in range(40):
+        states, moves, actions = play_straight(setup, rng)
+        game = new_game(setup, ScriptedPlayer(actions))
+        tick = rng.randrange(len(states))
+        for _ in range(tick):
+            game._update()
+
+        clone = game.clone()
+        assert state(clone) == states[tick]
+        while clone.get_outcome().state == TronCore.GameState.ongoing:
+            clone._update()
+        assert state(clone) == states[-1]
+        assert clone.get_moves() == moves
+        # playing the clone did not change the game it was copied from
+        assert state(game) == states[tick]
@@ -0,0 +1,50 @@
+# this file stores the tests of the territory index, checked against a Territory built from scratch every tick
+import random
+import pytest
+from TronCore import TronCore
+from board import Board
+from ai_inputs import TERRITORY
+from territory import Territory
+
+
+# a player that turns at random, and mostly avoids running into bodies so games last
+class RandomPlayer:
+
+    def __init__(self, rng):
+        self.rng = rng
+
+
+    def act(self, game, red):
+        heads = game.get_heads()
+        (x, y), (aim_x, aim_y) = heads[:2] if red else heads[2:]
+        bodies = game.get_bodies()
+        safe = [action for action, (dx, dy) in enumerate(TronCore.DIRECTIONS)
+                if (dx, dy) != (-aim_x, -aim_y) and not bodies[x + dx, y + dy]]
+        if safe and self.rng.random() < 0.9: return self.rng.choice(safe)
+        return self.rng.randrange(len(TronCore.DIRECTIONS))
+
+
+def regions(territory):
+    return sorted(tuple(region) for region in territory.regions)
+
+
+# boards where the heads start apart, and where they start next to each other
+BOARDS = [Board(cells=8), Board(cells=12), Board(cells=9, red_start=(4, 4), blue_start=(5, 4)),
+          Board(cells=10, red_start=(4, 5), blue_start=(5, 6), red_dir=(0, -1), blue_dir=(0, 1))]
+
+
+@pytest.mark.parametrize("board", BOARDS)
+def test_incremental_regions_match_a_rebuild(board):
+    rng = random.Random(472)
+    ticks = adjacent = 0
+    for _ in range(150):
+        game = TronCore(ai_red_net=RandomPlayer(rng), ai_blue_net=RandomPlayer(rng), board=board,
+                        percept_set=TERRITORY)
+        while game.get_outcome().state == TronCore.GameState.ongoing:
+            game._update()
+            assert regions(game._territory) == regions(Territory(game.get_bodies()))
+            (red_x, red_y), _, (blue_x, blue_y), _ = game.get_heads()
+            ticks += 1
+            # heads in each other's ring of 8 cells are where filling both before either is indexed went wrong
+            adjacent += max(abs(red_x - blue_x), abs(red_y - blue_y)) == 1
+    assert ticks > 1000 and adjacent > 0
@@ -0,0 +1,78 @@
+# this file stores the tests of training_stats, and of resuming training with its stats and profile files
+import json
+import os
+import random
+import pytest
+import NeatManager
+import checkpoint
+from profiler import Profiler
+from TronCore import TronCore
+from training_stats import StatsReporter, read_stats
+
+LOCAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# NeatManager set up to train a small population quickly in out, checkpointing every generation
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    with open(os.path.join(LOCAL_DIR, "config-feedforward.txt")) as f:
+        text = f.read().replace("pop_size = 40", "pop_size = 6")
+    config_path = str(tmp_path / "config.txt")
+    with open(config_path, "w") as f:
+        f.write(text)
+
+    monkeypatch.setattr(NeatManager, "OUT_DIR", str(tmp_path))
+    monkeypatch.setattr(NeatManager, "SNAPSHOTS", [])
+    monkeypatch.setattr(NeatManager, "RENDER_LAST", False)
+    monkeypatch.setattr(NeatManager, "WORKERS", 1)
+    monkeypatch.setattr(NeatManager, "CHECKPOINT_EVERY", 1)
+    monkeypatch.setattr(NeatManager.eval_genomes, "gen", 0)
+    # run() sets these, they are put back after the test
+    for name in ["STATS", "FITNESS", "PERCEPTS", "MATCHMAKER"]:
+        monkeypatch.setattr(NeatManager, name, getattr(NeatManager, name))
+    random.seed(472)
+    return config_path
+
+
+@pytest.mark.parametrize("name", ["stats.ndjson", "stats.csv"])
+def test_keep_before_starts_a_missing_file(tmp_path, name):
+    path = str(tmp_path / name)
+    StatsReporter(path, append=True).keep_before(3)
+    assert os.path.exists(path)
+    assert list(read_stats(path)) == []
+
+
+def test_resume_without_a_stats_file(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(NeatManager, "GENERATIONS", 2)
+    NeatManager.run(manager)
+    stats_path = os.path.join(str(tmp_path), NeatManager.STATS_PATH)
+    assert [record["generation"] for record in read_stats(stats_path)] == [0, 1]
+
+    # as when resuming into a new output directory with only the checkpoints copied over
+    os.remove(stats_path)
+    monkeypatch.setattr(NeatManager, "GENERATIONS", 3)
+    NeatManager.run(manager, checkpoint.latest(os.path.join(str(tmp_path), NeatManager.CHECKPOINT_DIR)))
+    assert [record["generation"] for record in read_stats(stats_path)] == [2]
+
+
+def test_resume_keeps_earlier_generations(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(NeatManager, "GENERATIONS", 2)
+    NeatManager.run(manager)
+
+    monkeypatch.setattr(NeatManager, "GENERATIONS", 3)
+    NeatManager.run(manager, os.path.join(str(tmp_path), NeatManager.CHECKPOINT_DIR))
+    stats_path = os.path.join(str(tmp_path), NeatManager.STATS_PATH)
+    assert [record["generation"] for record in read_stats(stats_path)] == [0, 1, 2]
+    assert len(NeatManager.STATS.recent) == 3
+
+
+def test_resume_keeps_earlier_profiles(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(NeatManager, "PROFILER", Profiler())
+    monkeypatch.setattr(TronCore, "PROFILER", None)
+    monkeypatch.setattr(NeatManager, "GENERATIONS", 2)
+    NeatManager.run(manager)
+
+    monkeypatch.setattr(NeatManager, "GENERATIONS", 3)
+    NeatManager.run(manager, os.path.join(str(tmp_path), NeatManager.CHECKPOINT_DIR))
+    with open(os.path.join(str(tmp_path), NeatManager.PROFILE_PATH)) as f:
+        assert [json.loads(line)["generation"] for line in f] == [0, 1, 2]
@@ -0,0 +1,244 @@
+# this file stores the statistics reporter of long training runs, and the tool that plots what it saved
+#
+# neat.StatisticsReporter keeps a copy of the best genome and the fitness of every genome of every generation,
+# so its memory grows for as long as training runs. StatsReporter instead appends a line of aggregates per generation
+# to a file: the spread of fitness, species sizes, the best genome's size, and how long games lasted and who won them.
+# Only the last window generations are kept in memory. The file is read back a line at a time by read_stats(),
+# so plotting a run never loads more than the columns being plotted.
+import collections
+import csv
+import json
+import os
+import time
+import numpy as np
+import neat
+import fitness
+from TronCore import TronCore
+
+# columns of every generation's line, species_sizes is a dict of species id to number of members
+COLUMNS = ["generation", "seconds", "elapsed", "population",
+           "fitness_mean", "fitness_stdev", "fitness_min", "fitness_q25", "fitness_median", "fitness_q75", "fitness_max",
+           "best_id", "best_nodes", "best_connections",
+           "species", "species_min", "species_mean", "species_max", "species_sizes",
+           "games", "red_won", "blue_won", "tie", "time_mean", "time_min", "time_median", "time_q90", "time_max"]
+
+
+"""
+A neat reporter that appends the aggregates of every generation to path, see COLUMNS.
+path is written as CSV if it ends in .csv and as NDJSON (a JSON object per line) otherwise,
+append keeps the lines already in it, as when training resumes.
+The games of a generation are counted by passing their GameOutcomes to add_outcomes() while it is evaluated.
+recent holds the last window generations' records.
+"""
+class StatsReporter(neat.reporting.BaseReporter):
+
+    def __init__(self, path, window=100, append=False):
+        self.path = path
+        self.format = "csv" if path.endswith(".csv") else "ndjson"
+        self.recent = collections.deque(maxlen=window)
+        self._start = time.perf_counter()
+        self._generation_start = self._start
+        self._generation = None
+        self._reset_games()
+
+        if not append:
+            with open(path, "w", newline="") as f:
+                if self.format == "csv": csv.writer(f).writerow(COLUMNS)
+
+
+    # drop the lines of generation and later, as when training resumes from a checkpoint taken before it,
+    # the lines before it are read back into recent, a missing file is started again
+    def keep_before(self, generation):
+        temporary = self.path + ".tmp"
+        with open(temporary, "w", newline="") as f:
+            if self.format == "csv": csv.writer(f).writerow(COLUMNS)
+            records = read_stats(self.path) if os.path.exists(self.path) else []
+            for record in records:
+                if record["generation"] >= generation: break
+                self._write(f, record)
+                self.recent.append(record)
+        os.replace(temporary, self.path)
+
+
+    def start_generation(self, generation):
+        self._generation = generation
+        self._generation_start = time.perf_counter()
+        self._reset_games()
+
+
+    # count games played in the generation being evaluated
+    def add_outcomes(self, outcomes):
+        if not outcomes: return
+        games = fitness.outcome_arrays(outcomes)
+        self._states += np.bincount(games.state, minlength=len(self._states))[:len(self._states)]
+        # game lengths are kept as a histogram, so quantiles are exact without keeping every game
+        lengths = np.bincount(games.time)
+        if len(lengths) > len(self._lengths): self._lengths.resize(len(lengths))
+        self._lengths[:len(lengths)] += lengths
+
+
+    def post_evaluate(self, config, population, species, best_genome):
+        now = time.perf_counter()
+        scores = np.array([genome.fitness for genome in population.values()], dtype=float)
+        fitness_quantiles = np.quantile(scores, [0, 0.25, 0.5, 0.75, 1]).tolist()
+        sizes = dict((species_id, len(s.members)) for species_id, s in species.species.items())
+        nodes, connections = best_genome.size()
+
+        record = {"generation": self._generation, "seconds": now - self._generation_start, "elapsed": now - self._start,
+                  "population": len(scores),
+                  "fitness_mean": float(scores.mean()), "fitness_stdev": float(scores.std()),
+                  "fitness_min": fitness_quantiles[0], "fitness_q25": fitness_quantiles[1],
+                  "fitness_median": fitness_quantiles[2], "fitness_q75": fitness_quantiles[3],
+                  "fitness_max": fitness_quantiles[4],
+                  "best_id": best_genome.key, "best_nodes": nodes, "best_connections": connections,
+                  "species": len(sizes),
+                  "species_min": min(sizes.values(), default=0), "species_max": max(sizes.values(), default=0),
+                  "species_mean": sum(sizes.values()) / len(sizes) if sizes else 0.0,
+                  "species_sizes": sizes}
+        record.update(self._game_stats())
+        self.recent.append(record)
+
+        with open(self.path, "a", newline="") as f:
+            self._write(f, record)
+
+
+    def _write(self, f, record):
+        if self.format == "csv":
+            sizes = " ".join("{0}:{1}".format(*item) for item in record["species_sizes"].items())
+            row = dict(record, species_sizes=sizes)
+            csv.writer(f).writerow(["" if row[column] is None else row[column] for column in COLUMNS])
+        else:
+            f.write(json.dumps(record) + "\n")
+
+
+    def _reset_games(self):
+        # games that ended in each GameState value, and games that lasted each number of ticks
+        self._states = np.zeros(max(state.value for state in TronCore.GameState) + 1, dtype=np.int64)
+        self._lengths = np.zeros(0, dtype=np.int64)
+
+
+    # how the games of the generation went, rates are of all its games, None where no games were counted
+    def _game_stats(self):
+        games = int(self._states.sum())
+        stats = {"games": games}
+        for state in [TronCore.GameState.red_won, TronCore.GameState.blue_won, TronCore.GameState.tie]:
+            stats[state.name] = float(self._states[state.value] / games) if games else None
+        if not games:
+            stats.update(time_mean=None, time_min=None, time_median=None, time_q90=None, time_max=None)
+            return stats
+
+        ticks = np.arange(len(self._lengths))
+        played = np.flatnonzero(self._lengths)
+        cumulative = np.cumsum(self._lengths)
+        stats.update(time_mean=float((ticks * self._lengths).sum() / games),
+                     time_min=int(played[0]),
+                     time_median=int(np.searchsorted(cumulative, games * 0.5)),
+                     time_q90=int(np.searchsorted(cumulative, games * 0.9)),
+                     time_max=int(played[-1]))
+        return stats
+
+
+"""
+The records of a file written by StatsReporter, one generation at a time.
+Records of either format are dicts of COLUMNS with the same types, missing values are None.
+"""
+def read_stats(path):
+    with open(path, newline="") as f:
+        if not path.endswith(".csv"):
+            for line in f:
+                if not line.strip(): continue
+                record = json.loads(line)
+                record["species_sizes"] = dict((int(key), size) for key, size in record["species_sizes"].items())
+                yield record
+            return
+
+        for row in csv.DictReader(f):
+            record = {}
+            for column, value in row.items():
+                if column == "species_sizes":
+                    record[column] = dict(tuple(int(part) for part in item.split(":")) for item in value.split())
+                elif value == "":
+                    record[column] = None
+                else:
+                    number = float(value)
+                    record[column] = int(number) if number.is_integer() and "." not in value else number
+            yield record
+
+
+"""
+Summary plots of a stats file saved to image_path: the spread of fitness, species sizes,
+game lengths and who won, by generation. Needs matplotlib, which training itself does not.
+"""
+def plot_stats(path, image_path):
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        raise ImportError("Plotting the stats needs matplotlib, pip install matplotlib")
+
+    # only the plotted columns are kept, species sizes by species id
+    plotted = ["generation", "fitness_min", "fitness_q25", "fitness_median", "fitness_q75", "fitness_max",
+               "time_mean", "time_median", "time_max", "red_won", "blue_won", "tie"]
+    columns = dict((column, []) for column in plotted)
+    species = {}
+    for record in read_stats(path):
+        for column in plotted:
+            columns[column].append(np.nan if record[column] is None else record[column])
+        for species_id, size in record["species_sizes"].items():
+            species.setdefault(species_id, {})[record["generation"]] = size
+    columns = dict((column, np.array(values, dtype=float)) for column, values in columns.items())
+    generations = columns["generation"]
+
+    figure, ((fitness_axes, species_axes), (time_axes, outcome_axes)) = plt.subplots(2, 2, figsize=(12, 8), sharex=True)
+
+    fitness_axes.fill_between(generations, columns["fitness_min"], columns["fitness_max"], alpha=0.15, label="min to max")
+    fitness_axes.fill_between(generations, columns["fitness_q25"], columns["fitness_q75"], alpha=0.35,
+                              label="quartiles")
+    fitness_axes.plot(generations, columns["fitness_median"], label="median")
+    fitness_axes.set_title("fitness")
+    fitness_axes.legend(loc="lower right")
+
+    species_ids = sorted(species)
+    species_axes.stackplot(generations, [[species[species_id].get(int(generation), 0) for generation in generations]
+                                         for species_id in species_ids])
+    species_axes.set_title("species sizes")
+
+    for column in ["time_mean", "time_median", "time_max"]:
+        time_axes.plot(generations, columns[column], label=column[len("time_"):])
+    time_axes.set_title("game length (ticks)")
+    time_axes.set_xlabel("generation")
+    time_axes.legend(loc="upper left")
+
+    outcome_axes.stackplot(generations, columns["red_won"], columns["blue_won"], columns["tie"],
+                           labels=["red won", "blue won", "tie"])
+    outcome_axes.set_title("outcomes")
+    outcome_axes.set_xlabel("generation")
+    outcome_axes.set_ylim(0, 1)
+    outcome_axes.legend(loc="upper left")
+
+    figure.tight_layout()
+    figure.savefig(image_path)
+    plt.close(figure)
+
+
+# python training_stats.py STATS_FILE [IMAGE]: plot a stats file, --text prints it instead
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Plot the statistics saved by StatsReporter")
+    parser.add_argument("path", help="stats file, .ndjson or .csv")
+    parser.add_argument("image", nargs="?", default="stats.png", help="image the plots are saved to")
+    parser.add_argument("--text", action="store_true", help="print a line per generation instead of plotting")
+    args = parser.parse_args()
+
+    if args.text:
+        for record in read_stats(args.path):
+            print("generation {0}: fitness median {1:.1f}, max {2:.1f}, {3} species, {4} games of {5:.1f} ticks on average, "
+                  "red won {6:.0%}, blue won {7:.0%}, tie {8:.0%}".format(
+                      record["generation"], record["fitness_median"], record["fitness_max"], record["species"],
+                      record["games"], record["time_mean"] or 0,
+                      record["red_won"] or 0, record["blue_won"] or 0, record["tie"] or 0))
+    else:
+        plot_stats(args.path, args.image)
+        print("saved", args.image)